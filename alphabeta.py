@@ -0,0 +1,293 @@
+import time
+from collections import OrderedDict
+import properties
+from engine import simulate
+
+
+#  Виды оценок в таблице транспозиций.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class Timeout(Exception):
+    """
+    Время на ход закончилось.
+    """
+
+
+class TranspositionTable:
+    """
+    Ограниченная таблица уже оценённых позиций.
+    Ключ - хеш Zobrist поля вместе с тем, чей ход, и последний
+    ход: ходы перебираются рядом с ним, так что от него зависят
+    и оценка, и лучший ход.
+    Когда таблица заполнена, вытесняется позиция,
+    к которой дольше всего не обращались.
+    """
+
+    def __init__(self, size: int = properties.TABLE_SIZE):
+        """
+        Args:
+            size (int): Максимальное количество позиций.
+        """
+        self.size = size
+        self.entries = OrderedDict()
+        #  Счётчики для подбора размера таблицы.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple):
+        """
+        Ищет позицию в таблице.
+
+        Args:
+            key ((int, int)): Хеш позиции и последний ход.
+
+        Returns:
+            (int, float, int, int): Глубина, оценка, вид оценки
+            и лучший ход или None, если позиции нет.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, depth: int, value: float, flag: int,
+            move: int):
+        """
+        Записывает оценку позиции.
+        Более глубокая оценка той же позиции не затирается.
+
+        Args:
+            key ((int, int)): Хеш позиции и последний ход.
+            depth (int): Глубина перебора.
+            value (float): Оценка.
+            flag (int): Вид оценки: EXACT, LOWER или UPPER.
+            move (int): Лучший ход.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] > depth:
+                return
+            self.entries.move_to_end(key)
+        elif len(self.entries) >= self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.entries[key] = (depth, value, flag, move)
+
+    def stats(self):
+        """
+        Возвращает счётчики таблицы.
+
+        Returns:
+            dict: Размер, попадания, промахи, вытеснения и доля попаданий.
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class AlphaBeta:
+    """
+    Перебор с альфа-бета отсечением и итеративным углублением.
+    Оценка позиции - разница счёта того, чей ход, и противника.
+    Ходы упорядочиваются по тем же коэфицентам, что и у умного
+    компьютера: DEFENCE_PRIORITY и ATTACK_PRIORITY.
+    """
+
+    def __init__(
+            self, depth: int = properties.SEARCH_DEPTH,
+            think_time: float = properties.THINK_TIME,
+            width: int = properties.SEARCH_WIDTH,
+            table: TranspositionTable = None,
+            stop=None,
+            check_area: int = properties.CHECK_AREA,
+            defence_priority: float = properties.DEFENCE_PRIORITY,
+            attack_priority: float = properties.ATTACK_PRIORITY):
+        """
+        Args:
+            depth (int): Максимальная глубина перебора.
+            think_time (float): Время на ход в секундах.
+            width (int): Сколько лучших по эвристике ходов
+            перебирается в каждой позиции.
+            table (TranspositionTable, optional): Таблица транспозиций.
+            stop (threading.Event, optional): Флаг досрочной остановки.
+            check_area (int): Размер зоны, в которой ищутся ходы.
+            defence_priority (float): Приоритет защиты в эвристике.
+            attack_priority (float): Приоритет атаки в эвристике.
+        """
+        self.depth = depth
+        self.think_time = think_time
+        self.width = width
+        self.check_area = check_area
+        self.defence_priority = defence_priority
+        self.attack_priority = attack_priority
+        if table is None:
+            table = TranspositionTable()
+        self.table = table
+        self.stop = stop
+        #  Количество просмотренных позиций за последний поиск.
+        self.nodes = 0
+        #  Глубина, до которой успел закончиться последний поиск.
+        self.reached = 0
+        self.deadline = None
+
+    def order(self, state, last: int, depth: int, first: int):
+        """
+        Возвращает ходы для того, чей ход,
+        от самых перспективных к менее перспективным.
+
+        Args:
+            state (GameState): Состояние игры.
+            last (int): Индекс клетки последнего хода.
+            depth (int): Оставшаяся глубина перебора.
+            first (int): Ход из таблицы транспозиций, он идёт первым.
+
+        Returns:
+            list(int): Индексы клеток.
+        """
+        board = state.board
+        me = state.turn
+        enemy = (me + 1) % 2
+        if last is None:
+            moves = board.candidates(enemy)
+        else:
+            moves = board.candidates_near(
+                enemy, last, self.check_area)
+            #  При равной эвристике ближние к последнему ходу лучше.
+            x, y = board.pos(last)
+            moves.sort(key=lambda move: max(
+                abs(move // board.linesY - x), abs(move % board.linesY - y)))
+        if depth >= 2:
+            #  Перед последним ходом перебираются все ходы,
+            #  а выше - только лучшие по эвристике.
+            gains = simulate(
+                state, [board.pos(move) for move in moves], me, enemy)
+            keys = {
+                move: max(defence * self.defence_priority,
+                          attack * self.attack_priority)
+                for move, (defence, attack) in zip(moves, gains)}
+            moves.sort(key=lambda move: -keys[move])
+            moves = moves[:self.width]
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def negamax(
+            self, state, depth: int,
+            alpha: float, beta: float, last: int):
+        """
+        Перебор с альфа-бета отсечением.
+
+        Args:
+            state (GameState): Состояние игры.
+            depth (int): Оставшаяся глубина перебора.
+            alpha (float): Нижняя граница.
+            beta (float): Верхняя граница.
+            last (int): Индекс клетки последнего хода.
+
+        Returns:
+            (float, int): Оценка позиции для того, чей ход,
+            и лучший ход.
+        """
+        self.nodes += 1
+        if self.nodes % 256 == 0 and time.perf_counter() > self.deadline:
+            raise Timeout()
+        if self.stop is not None and self.stop.is_set():
+            raise Timeout()
+
+        me = state.turn
+        value = state.score[me] - state.score[(me + 1) % 2]
+        if depth == 0:
+            return value, None
+
+        key = (state.board.turn_hash(me), last)
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, entry_value, flag, first = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return entry_value, first
+                if flag == LOWER:
+                    alpha = max(alpha, entry_value)
+                else:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    return entry_value, first
+
+        moves = self.order(state, last, depth, first)
+        if not moves:
+            return value, None
+
+        start = alpha
+        best, best_move = float("-inf"), None
+        for move in moves:
+            delta = state.make_move(state.board.pos(move))
+            try:
+                value = -self.negamax(
+                    state, depth - 1, -beta, -alpha, move)[0]
+            finally:
+                state.unmake_move(delta)
+            if value > best:
+                best, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best <= start:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.put(key, depth, best, flag, best_move)
+        return best, best_move
+
+    def search(self, game, player_pos: tuple):
+        """
+        Выбирает ход для того, чей ход, углубляя перебор,
+        пока не кончится время или не будет достигнута глубина.
+
+        Args:
+            game (GameState): Состояние игры.
+            player_pos ((int, int)): Последний ход игрока.
+
+        Returns:
+            (int, int): Пара (X, Y) или None, если ходить некуда.
+        """
+        state = game.copy()
+        board = state.board
+        last = None if player_pos is None else board.index(player_pos)
+        self.deadline = time.perf_counter() + self.think_time
+        self.nodes = 0
+        self.reached = 0
+        best = None
+        for depth in range(1, self.depth + 1):
+            try:
+                _, move = self.negamax(
+                    state, depth, float("-inf"), float("inf"), last)
+            except Timeout:
+                break
+            if move is None:
+                break
+            best = move
+            self.reached = depth
+        if best is None:
+            #  Даже первая итерация не успела закончиться.
+            moves = self.order(state, last, 1, None)
+            if not moves:
+                return None
+            best = moves[0]
+        return board.pos(best)
@@ -0,0 +1,396 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from cli import parse_size
+from engine import GameState
+from computer import Computer
+from mcts import MCTS, Node
+
+
+#  Размеры полей по умолчанию: маленькое, стандартное и самое большое.
+SIZES = ((10, 10), (39, 32), (99, 99))
+#  Во сколько раз замер может стать медленнее,
+#  прежде чем это считается регрессией.
+TOLERANCE = 1.5
+#  Более быстрые замеры не сравниваются: у них слишком большой шум.
+NOISE_MS = 0.05
+
+
+class Timer:
+    """
+    Собирает длительности вызовов в миллисекундах.
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, name: str, func, *args, **kwargs):
+        """
+        Вызывает функцию и запоминает время её работы.
+
+        Args:
+            name (str): Название замера.
+            func: Вызываемая функция.
+
+        Returns:
+            Результат функции.
+        """
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.samples.setdefault(name, []).append(
+            (time.perf_counter() - start) * 1000)
+        return result
+
+    def wrap(self, obj, name: str):
+        """
+        Подменяет метод объекта на замеряемый.
+        Вызовы изнутри объекта через self тоже замеряются.
+
+        Args:
+            obj: Объект.
+            name (str): Имя метода.
+        """
+        func = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            return self.measure(name, func, *args, **kwargs)
+        setattr(obj, name, timed)
+
+    def summary(self):
+        """
+        Возвращает сводку по всем замерам.
+
+        Returns:
+            dict: Для каждого замера количество вызовов,
+            сумма, среднее, медиана, 95-й перцентиль и максимум в мс.
+        """
+        result = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            result[name] = {
+                "calls": len(samples),
+                "total_ms": sum(samples),
+                "mean_ms": statistics.fmean(samples),
+                "median_ms": statistics.median(samples),
+                "p95_ms": ordered[int(0.95 * (len(ordered) - 1))],
+                "max_ms": ordered[-1],
+            }
+        return result
+
+
+def next_move(state: GameState, rnd: random.Random, last: tuple):
+    """
+    Выбирает ход для воспроизводимой партии.
+    Чаще всего ход делается рядом с последним, чтобы
+    на поле возникали окружения, иначе - в случайную клетку.
+
+    Args:
+        state (GameState): Состояние игры.
+        rnd (random.Random): Генератор с заданным зерном.
+        last ((int, int)): Последний ход.
+
+    Returns:
+        (int, int): Пара (X, Y) или None, если ходить некуда.
+    """
+    board = state.board
+    if last is not None and rnd.random() < 0.7:
+        near = board.free_neighbours8(board.index(last))
+        if near:
+            return board.pos(rnd.choice(near))
+    free = [idx for idx, cell in enumerate(board.cells) if cell == 0]
+    if not free:
+        return None
+    return board.pos(rnd.choice(free))
+
+
+def play(
+        linesX: int, linesY: int, seed: int,
+        timer: Timer = None, moves: int = None,
+        computer_every: int = 0):
+    """
+    Играет воспроизводимую партию.
+
+    Args:
+        linesX (int): Количество точек по ОХ.
+        linesY (int): Количество точек по ОY.
+        seed (int): Зерно генератора ходов.
+        timer (Timer, optional): Куда записывать замеры.
+        moves (int, optional): Ограничение на количество ходов.
+        computer_every (int): Раз в сколько ходов замерять
+        ходы компьютера. 0 - не замерять.
+
+    Returns:
+        (GameState, int): Состояние в конце партии и количество ходов.
+    """
+    rnd = random.Random(seed)
+    state = GameState(linesX, linesY)
+    if timer is not None:
+        for name in ("put_dot", "check", "build_cover"):
+            timer.wrap(state, name)
+    computer = Computer(1)
+
+    if moves is None:
+        moves = linesX * linesY
+    last = None
+    count = 0
+    for count in range(moves):
+        if timer is not None and computer_every and last is not None and \
+                count % computer_every == 0:
+            #  Ходы компьютера только оцениваются, но не делаются,
+            #  чтобы партия не зависела от замеров. Оценка идёт на
+            #  копии, чтобы не смешивать её с замерами самой партии.
+            computer.load_game(state.copy())
+            random.seed(seed + count)
+            timer.measure("random_move", computer.random_move)
+            timer.measure("smart_move", computer.smart_move, last)
+        pos = next_move(state, rnd, last)
+        if pos is None:
+            break
+        state.put_dot(pos)
+        last = pos
+    else:
+        count = moves
+    return state, count
+
+
+def bench_history(state: GameState, timer: Timer, steps: int):
+    """
+    Замеряет отмену и повтор последних ходов.
+
+    Args:
+        state (GameState): Состояние с историей ходов.
+        timer (Timer): Куда записывать замеры.
+        steps (int): Сколько ходов отменить и повторить.
+    """
+    steps = min(steps, len(state.history_undo))
+    for _ in range(steps):
+        timer.measure("undo", state.undo)
+    for _ in range(steps):
+        timer.measure("redo", state.redo)
+
+
+def bench_draw(state: GameState, timer: Timer, frames: int):
+    """
+    Замеряет отрисовку кадра на поверхности без окна.
+
+    Args:
+        state (GameState): Состояние игры.
+        timer (Timer): Куда записывать замеры.
+        frames (int): Количество кадров.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import properties
+    from game_drawer import draw_env, Renderer
+
+    pygame.init()
+    size = [
+        properties.BLOCK_SIZE * (state.linesX - 1) + properties.GAP * 2,
+        properties.UP_LENGTH + properties.BLOCK_SIZE * (state.linesY - 1) +
+        properties.GAP * 2]
+    screen = pygame.Surface(size)
+    #  Многоугольники считаются при первой отрисовке.
+    timer.measure(
+        "polygons", lambda: [cover.points() for cover in state.polygons])
+    for frame in range(frames):
+        pos = (frame % state.linesX, frame % state.linesY)
+        timer.measure(
+            "draw_env", draw_env,
+            screen, size, pos,
+            state.linesX, state.linesY, state.game_mode,
+            state.turn,
+            state.dots, state.occupied_dots,
+            state.polygons,
+            state.score,
+            ("Синие", "Красные"))
+
+    #  Отрисовка слоями: первый кадр рисует всё, остальные -
+    #  только сдвиг точки под курсором.
+    renderer = Renderer(size, state.linesX, state.linesY)
+    for frame in range(frames):
+        pos = (frame % state.linesX, frame % state.linesY)
+        timer.measure(
+            "render", renderer.draw,
+            screen, pos, state, ("Синие", "Красные"))
+
+
+def bench_mcts(linesX: int, linesY: int, seed: int, timer: Timer,
+               playouts: int):
+    """
+    Замеряет случайные партии и проигрывания компьютера Монте-Карло
+    в середине партии, когда занята четверть поля.
+
+    Args:
+        linesX (int): Количество точек по ОХ.
+        linesY (int): Количество точек по ОY.
+        seed (int): Зерно генератора ходов.
+        timer (Timer): Куда записывать замеры.
+        playouts (int): Сколько проигрываний сделать.
+
+    Returns:
+        float: Проигрываний в секунду.
+    """
+    state, _ = play(linesX, linesY, seed, moves=linesX * linesY // 4)
+    last = state.board.index(state.moves[-1][1]) if state.moves else None
+    #  Без истории ходов, как в поиске компьютера.
+    state = state.copy()
+    search = MCTS()
+    random.seed(seed)
+    for _ in range(playouts):
+        timer.measure("rollout", search.rollout, state, last)
+    root = Node(last, (state.turn + 1) % 2)
+    start = time.perf_counter()
+    for _ in range(playouts):
+        timer.measure("playout", search.playout, state, root)
+    return playouts / (time.perf_counter() - start)
+
+
+def peak_memory(linesX: int, linesY: int, seed: int, moves: int):
+    """
+    Считает пиковое потребление памяти партией.
+    Делается отдельной партией: tracemalloc замедляет замеры.
+
+    Returns:
+        int: Пик выделенной памяти в байтах.
+    """
+    tracemalloc.start()
+    play(linesX, linesY, seed, moves=moves)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def run(args):
+    """
+    Прогоняет все замеры.
+
+    Returns:
+        dict: Результаты для сохранения в JSON.
+    """
+    results = []
+    for linesX, linesY in args.sizes:
+        timer = Timer()
+        start = time.perf_counter()
+        state, count = play(
+            linesX, linesY, args.seed, timer,
+            args.moves, args.computer_every)
+        elapsed = time.perf_counter() - start
+        bench_history(state, timer, args.history)
+        if args.frames:
+            bench_draw(state, timer, args.frames)
+        playouts_per_s = None
+        if args.playouts:
+            playouts_per_s = bench_mcts(
+                linesX, linesY, args.seed, timer, args.playouts)
+        results.append({
+            "size": [linesX, linesY],
+            "moves": count,
+            "score": list(state.score),
+            "game_s": elapsed,
+            "playouts_per_s": playouts_per_s,
+            "peak_memory_bytes": peak_memory(
+                linesX, linesY, args.seed, args.moves),
+            "timings": timer.summary(),
+        })
+        print(f"{linesX}x{linesY}: {count} ходов за {elapsed:.2f} с",
+              file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict, tolerance: float = TOLERANCE):
+    """
+    Сравнивает два прогона по медианам времени.
+
+    Args:
+        old (dict): Прошлые результаты.
+        new (dict): Новые результаты.
+        tolerance (float): Допустимое замедление.
+
+    Returns:
+        list(str): Описания регрессий.
+    """
+    regressions = []
+    before = {tuple(item["size"]): item for item in old["results"]}
+    for item in new["results"]:
+        prev = before.get(tuple(item["size"]))
+        if prev is None:
+            continue
+        size = "x".join(map(str, item["size"]))
+        for name, stats in item["timings"].items():
+            prev_stats = prev["timings"].get(name)
+            if prev_stats is None:
+                continue
+            if max(prev_stats["median_ms"], stats["median_ms"]) < NOISE_MS:
+                continue
+            ratio = stats["median_ms"] / prev_stats["median_ms"]
+            if ratio > tolerance:
+                regressions.append(
+                    f"{size} {name}: {prev_stats['median_ms']:.3f} -> "
+                    f"{stats['median_ms']:.3f} мс (x{ratio:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Замеры скорости движка, компьютера и отрисовки.")
+    parser.add_argument(
+        "--sizes", type=parse_size, nargs="+", default=list(SIZES),
+        help="размеры полей, например 10x10 39x32")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--moves", type=int, default=None,
+        help="ограничение на количество ходов в партии")
+    parser.add_argument(
+        "--computer-every", type=int, default=25,
+        help="раз в сколько ходов замерять ходы компьютера, 0 - никогда")
+    parser.add_argument(
+        "--history", type=int, default=200,
+        help="сколько ходов отменить и повторить")
+    parser.add_argument(
+        "--frames", type=int, default=30,
+        help="сколько кадров отрисовать, 0 - не замерять отрисовку")
+    parser.add_argument(
+        "--playouts", type=int, default=300,
+        help="сколько проигрываний Монте-Карло замерить, 0 - не замерять")
+    parser.add_argument(
+        "--output", "-o", default=None,
+        help="файл для результатов, по умолчанию вывод в консоль")
+    parser.add_argument(
+        "--compare", default=None,
+        help="файл с прошлыми результатами для поиска регрессий")
+    parser.add_argument(
+        "--tolerance", type=float, default=TOLERANCE,
+        help="допустимое замедление медианы при сравнении")
+    args = parser.parse_args()
+
+    result = run(args)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(
+                json.load(file), result, args.tolerance)
+        for line in regressions:
+            print("Регрессия:", line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,578 @@
+import random
+
+
+#  Состояния клетки игрового поля.
+#  Младшие два бита - владелец точки (номер игрока + 1).
+EMPTY = 0
+OWNER = 3
+#  Точка захвачена противником.
+CAPTURED = 4
+#  Клетка попала в окружённую зону, туда ходить нельзя.
+BLOCKED = 8
+#  Количество бит в состоянии клетки.
+BITS = 4
+#  Сторона квадрата сетки, по которому раскладываются кандидаты.
+BUCKET = 8
+
+#  Ключи Zobrist для каждого размера поля.
+_zobrist = {}
+#  Номера квадратов сетки для каждого размера поля.
+_buckets = {}
+#  Таблицы соседей для каждого размера поля.
+_neighbours = {}
+
+
+def zobrist_keys(linesX: int, linesY: int):
+    """
+    Возвращает случайные 64-битные ключи для хеширования поля:
+    по ключу на каждый бит состояния каждой клетки и
+    последним элементом - ключ для хода второго игрока.
+    Ключи зависят только от размера поля, поэтому
+    совпадают во всех процессах. Создаются один раз на размер.
+
+    Args:
+        linesX (int): Количество точек по ОХ.
+        linesY (int): Количество точек по ОY.
+
+    Returns:
+        list(int): Ключи.
+    """
+    keys = _zobrist.get((linesX, linesY))
+    if keys is None:
+        rnd = random.Random(f"zobrist {linesX} {linesY}")
+        keys = [rnd.getrandbits(64)
+                for _ in range(linesX * linesY * BITS + 1)]
+        _zobrist[(linesX, linesY)] = keys
+    return keys
+
+
+def bucket_map(linesX: int, linesY: int):
+    """
+    Возвращает для каждой клетки номер квадрата BUCKET x BUCKET,
+    в который она попадает. Создаётся один раз на размер поля.
+
+    Args:
+        linesX (int): Количество точек по ОХ.
+        linesY (int): Количество точек по ОY.
+
+    Returns:
+        (list(int), int): Номера квадратов и число квадратов по ОY.
+    """
+    result = _buckets.get((linesX, linesY))
+    if result is None:
+        rows = -(-linesY // BUCKET)
+        result = ([x // BUCKET * rows + y // BUCKET
+                   for x in range(linesX) for y in range(linesY)], rows)
+        _buckets[(linesX, linesY)] = result
+    return result
+
+
+def neighbour_map(linesX: int, linesY: int):
+    """
+    Возвращает таблицы соседей для каждой клетки:
+    по четырём и по восьми направлениям и отметки рамки поля.
+    Соседи по четырём направлениям упорядочены так, что
+    последним идёт сосед в сторону ближайшей рамки:
+    обход в глубину берёт его первым и быстрее доходит до рамки.
+    Таблицы создаются один раз на размер поля
+    и общие для всех партий этого размера.
+
+    Args:
+        linesX (int): Количество точек по ОХ.
+        linesY (int): Количество точек по ОY.
+
+    Returns:
+        (list(tuple(int)), list(tuple(int)), bytearray):
+        Соседи по четырём и по восьми направлениям
+        и 1 для клеток на рамке.
+    """
+    result = _neighbours.get((linesX, linesY))
+    if result is None:
+        sides = []
+        around = []
+        edge = bytearray(linesX * linesY)
+        for x in range(linesX):
+            for y in range(linesY):
+                idx = x * linesY + y
+                #  Расстояние до рамки и сосед в ту сторону.
+                steps = []
+                if x > 0:
+                    steps.append((x, idx - linesY))
+                if y > 0:
+                    steps.append((y, idx - 1))
+                if y < linesY - 1:
+                    steps.append((linesY - 1 - y, idx + 1))
+                if x < linesX - 1:
+                    steps.append((linesX - 1 - x, idx + linesY))
+                steps.sort(key=lambda step: -step[0])
+                sides.append(tuple(neigh for _, neigh in steps))
+                around.append(tuple(
+                    nx * linesY + ny
+                    for nx in range(max(x - 1, 0), min(x + 2, linesX))
+                    for ny in range(max(y - 1, 0), min(y + 2, linesY))
+                    if nx != x or ny != y))
+                edge[idx] = (x == 0 or x == linesX - 1 or
+                             y == 0 or y == linesY - 1)
+        result = (sides, around, edge)
+        _neighbours[(linesX, linesY)] = result
+    return result
+
+
+class Board:
+    """
+    Игровое поле в виде плоского массива байт.
+    Клетка (x, y) хранится по индексу x * linesY + y,
+    поэтому порядок индексов совпадает с обходом поля
+    сначала по ОХ, потом по ОY.
+    Вместе с клетками поддерживаются кандидаты для ходов
+    компьютера: свободные клетки рядом с активными точками
+    каждого игрока. Каждое изменение клетки обновляет только
+    её и её восемь соседей, поэтому кандидатов не нужно
+    искать перебором поля.
+    """
+    __slots__ = (
+        "linesX", "linesY", "cells", "journal", "keys", "hash", "free",
+        "near", "frontier", "buckets", "rows", "sides", "around", "edge",
+        "tracking")
+
+    def __init__(
+            self, linesX: int, linesY: int,
+            cells: bytearray = None, hash_value: int = None,
+            frontier: tuple = None):
+        """
+        Инициализирует пустое поле.
+
+        Args:
+            linesX (int): Количество точек по ОХ.
+            linesY (int): Количество точек по ОY.
+            cells (bytearray, optional): Готовое содержимое поля.
+            hash_value (int, optional): Хеш готового содержимого.
+            frontier (tuple, optional): Готовые near и frontier
+            для этого содержимого.
+        """
+        self.linesX = linesX
+        self.linesY = linesY
+        if cells is None:
+            cells = bytearray(linesX * linesY)
+        self.cells = cells
+        #  Журнал изменений (индекс, старое значение).
+        #  Ведётся, только если это список.
+        self.journal = None
+        #  Хеш Zobrist поля. Обновляется при каждом изменении клетки.
+        self.keys = zobrist_keys(linesX, linesY)
+        if hash_value is None:
+            hash_value = 0
+            for idx, value in enumerate(cells):
+                hash_value ^= self.cell_hash(idx, value)
+        self.hash = hash_value
+        #  Количество свободных клеток. Обновляется вместе с клетками.
+        self.free = cells.count(EMPTY)
+        self.buckets, self.rows = bucket_map(linesX, linesY)
+        self.sides, self.around, self.edge = neighbour_map(linesX, linesY)
+        #  Обновлять ли кандидатов при изменении клеток.
+        #  Отключается на ходы, которые сразу откатываются.
+        self.tracking = True
+        if frontier is None:
+            #  Для каждого игрока: сколько его активных точек
+            #  среди восьми соседей клетки.
+            self.near = [bytearray(len(cells)), bytearray(len(cells))]
+            #  Для каждого игрока: свободные клетки, у которых
+            #  есть соседние активные точки, по квадратам сетки.
+            self.frontier = [
+                [set() for _ in range(max(self.buckets, default=-1) + 1)]
+                for _ in range(2)]
+            for idx, value in enumerate(cells):
+                if value != EMPTY:
+                    self.touch(idx, EMPTY, value)
+        else:
+            self.near, self.frontier = frontier
+
+    def copy(self):
+        """
+        Возвращает копию поля.
+        """
+        return Board(
+            self.linesX, self.linesY, self.cells[:], self.hash,
+            ([near[:] for near in self.near],
+             [[bucket.copy() for bucket in frontier]
+              for frontier in self.frontier]))
+
+    def touch(self, idx: int, old: int, new: int):
+        """
+        Обновляет кандидатов после изменения клетки.
+        Вызывается, когда в клетке уже записано новое состояние.
+
+        Args:
+            idx (int): Индекс клетки.
+            old (int): Старое состояние.
+            new (int): Новое состояние.
+        """
+        cells = self.cells
+        buckets = self.buckets
+        old_dot = old & (OWNER | CAPTURED)
+        new_dot = new & (OWNER | CAPTURED)
+        if old_dot != new_dot:
+            #  Активная точка убрана у одного игрока
+            #  и/или поставлена у другого.
+            for dot, step in ((old_dot, -1), (new_dot, 1)):
+                if dot != 1 and dot != 2:
+                    continue
+                near = self.near[dot - 1]
+                frontier = self.frontier[dot - 1]
+                for neigh in self.around[idx]:
+                    count = near[neigh] + step
+                    near[neigh] = count
+                    if cells[neigh] != EMPTY:
+                        continue
+                    if count == 0:
+                        frontier[buckets[neigh]].discard(neigh)
+                    elif count == 1 and step > 0:
+                        frontier[buckets[neigh]].add(neigh)
+        if (old == EMPTY) != (new == EMPTY):
+            bucket = buckets[idx]
+            for player in (0, 1):
+                if new != EMPTY:
+                    self.frontier[player][bucket].discard(idx)
+                elif self.near[player][idx]:
+                    self.frontier[player][bucket].add(idx)
+
+    def cell_hash(self, idx: int, value: int):
+        """
+        Возвращает вклад клетки с данным состоянием в хеш поля.
+        Для изменения клетки хеш меняется на
+        cell_hash(idx, old ^ new).
+
+        Args:
+            idx (int): Индекс клетки.
+            value (int): Состояние клетки.
+
+        Returns:
+            int: Вклад в хеш.
+        """
+        keys = self.keys
+        base = idx * BITS
+        result = 0
+        for bit in range(BITS):
+            if value >> bit & 1:
+                result ^= keys[base + bit]
+        return result
+
+    def turn_hash(self, turn: int):
+        """
+        Возвращает хеш поля вместе с тем, чей ход.
+
+        Args:
+            turn (int): Чей ход.
+
+        Returns:
+            int: Хеш.
+        """
+        return self.hash ^ self.keys[-1] if turn else self.hash
+
+    def index(self, pos: tuple):
+        """
+        Переводит координаты точки в индекс клетки.
+
+        Args:
+            pos ((int, int)): Координаты точки.
+
+        Returns:
+            int: Индекс клетки.
+        """
+        return pos[0] * self.linesY + pos[1]
+
+    def pos(self, idx: int):
+        """
+        Переводит индекс клетки в координаты точки.
+
+        Args:
+            idx (int): Индекс клетки.
+
+        Returns:
+            (int, int): Координаты точки.
+        """
+        return divmod(idx, self.linesY)
+
+    def neighbours(self, idx: int):
+        """
+        Возвращает соседей клетки по четырём направлениям.
+
+        Args:
+            idx (int): Индекс клетки.
+
+        Returns:
+            tuple(int): Индексы соседних клеток.
+        """
+        return self.sides[idx]
+
+    def neighbours8(self, idx: int):
+        """
+        Возвращает соседей клетки по восьми направлениям.
+
+        Args:
+            idx (int): Индекс клетки.
+
+        Returns:
+            tuple(int): Индексы соседних клеток.
+        """
+        return self.around[idx]
+
+    def free_neighbours8(self, idx: int):
+        """
+        Возвращает свободных соседей клетки по восьми направлениям.
+
+        Args:
+            idx (int): Индекс клетки.
+
+        Returns:
+            list(int): Индексы соседних клеток.
+        """
+        cells = self.cells
+        return [neigh for neigh in self.neighbours8(idx)
+                if cells[neigh] == EMPTY]
+
+    def candidates(self, player: int):
+        """
+        Возвращает все свободные клетки
+        по соседству с активными точками игрока.
+
+        Args:
+            player (int): Номер игрока.
+
+        Returns:
+            list(int): Индексы клеток по возрастанию.
+        """
+        result = []
+        for bucket in self.frontier[player]:
+            result.extend(bucket)
+        return sorted(result)
+
+    def window(self, player: int, x: int, y: int, radius: int):
+        """
+        Возвращает кандидатов игрока, расстояние от которых
+        до клетки (x, y) по каждой оси не больше radius.
+        Перебираются только квадраты сетки, задевающие окно.
+
+        Args:
+            player (int): Игрок.
+            x (int): Координата клетки по ОХ.
+            y (int): Координата клетки по ОY.
+            radius (int): Размер окна.
+
+        Returns:
+            list(int): Индексы клеток в порядке квадратов сетки.
+        """
+        linesY, rows = self.linesY, self.rows
+        frontier = self.frontier[player]
+        result = []
+        for bx in range(max(x - radius, 0) // BUCKET,
+                        min(x + radius, self.linesX - 1) // BUCKET + 1):
+            for by in range(max(y - radius, 0) // BUCKET,
+                            min(y + radius, linesY - 1) // BUCKET + 1):
+                for cell in frontier[bx * rows + by]:
+                    cx, cy = divmod(cell, linesY)
+                    if abs(cx - x) <= radius and abs(cy - y) <= radius:
+                        result.append(cell)
+        return result
+
+    def nearest(self, player: int, x: int, y: int):
+        """
+        Возвращает расстояние по большей из осей от клетки (x, y)
+        до ближайшего кандидата игрока или None, если их нет.
+        Квадраты сетки перебираются кольцами от клетки,
+        пока в дальних кольцах не может найтись никого ближе.
+
+        Args:
+            player (int): Игрок.
+            x (int): Координата клетки по ОХ.
+            y (int): Координата клетки по ОY.
+
+        Returns:
+            int: Расстояние или None.
+        """
+        linesY, rows = self.linesY, self.rows
+        columns = -(-self.linesX // BUCKET)
+        frontier = self.frontier[player]
+        bx, by = x // BUCKET, y // BUCKET
+        best = None
+        for ring in range(max(columns, rows)):
+            #  Клетки в кольце ring не ближе, чем это расстояние.
+            if best is not None and best <= (ring - 1) * BUCKET + 1:
+                break
+            for cx in range(max(bx - ring, 0), min(bx + ring + 1, columns)):
+                for cy in range(max(by - ring, 0),
+                                min(by + ring + 1, rows)):
+                    if max(abs(cx - bx), abs(cy - by)) != ring:
+                        continue
+                    for cell in frontier[cx * rows + cy]:
+                        px, py = divmod(cell, linesY)
+                        distance = max(abs(px - x), abs(py - y))
+                        if best is None or distance < best:
+                            best = distance
+        return best
+
+    def candidates_near(self, player: int, idx: int, radius: int):
+        """
+        Возвращает свободные клетки по соседству с активными точками
+        игрока, расстояние от которых до клетки idx по каждой оси
+        не больше radius.
+        Если не находит подходящих клеток, то зона поиска расширяется
+        до ближайшего кандидата.
+        То же самое, что отфильтровать candidates(player),
+        но без обхода всего поля.
+
+        Args:
+            player (int): Номер игрока.
+            idx (int): Индекс центральной клетки.
+            radius (int): Начальный размер зоны поиска.
+
+        Returns:
+            list(int): Индексы клеток по возрастанию.
+        """
+        x, y = divmod(idx, self.linesY)
+        result = self.window(player, x, y, radius)
+        if not result:
+            distance = self.nearest(player, x, y)
+            if distance is None:
+                return []
+            result = self.window(player, x, y, distance)
+        return sorted(result)
+
+    def is_free(self, idx: int):
+        """
+        Проверяет, можно ли поставить точку в клетку.
+        """
+        return self.cells[idx] == EMPTY
+
+    def is_dot(self, idx: int, player: int):
+        """
+        Проверяет, стоит ли в клетке активная точка игрока.
+        """
+        return self.cells[idx] & (OWNER | CAPTURED) == player + 1
+
+    def is_occupied(self, idx: int, player: int):
+        """
+        Проверяет, стоит ли в клетке захваченная точка игрока.
+        """
+        return self.cells[idx] & (OWNER | CAPTURED) == player + 1 | CAPTURED
+
+    def owner(self, idx: int):
+        """
+        Возвращает владельца точки в клетке или -1, если точки нет.
+        """
+        return (self.cells[idx] & OWNER) - 1
+
+    def set(self, idx: int, value: int):
+        """
+        Записывает состояние клетки, отмечая изменение в журнале.
+
+        Args:
+            idx (int): Индекс клетки.
+            value (int): Новое состояние.
+        """
+        old = self.cells[idx]
+        if self.journal is not None:
+            self.journal.append((idx, old))
+        self.hash ^= self.cell_hash(idx, old ^ value)
+        self.free += (value == EMPTY) - (old == EMPTY)
+        self.cells[idx] = value
+        if self.tracking:
+            self.touch(idx, old, value)
+
+    def put(self, idx: int, player: int):
+        """
+        Ставит точку игрока в клетку.
+        """
+        self.set(idx, player + 1)
+
+    def capture(self, idx: int):
+        """
+        Объявляет точку в клетке захваченной.
+        """
+        self.set(idx, self.cells[idx] | CAPTURED)
+
+    def release(self, idx: int):
+        """
+        Освобождает точку в клетке из под захвата.
+        """
+        self.set(idx, self.cells[idx] & ~CAPTURED)
+
+    def block(self, idx: int):
+        """
+        Запрещает ходить в клетку.
+        """
+        if not self.cells[idx] & BLOCKED:
+            self.set(idx, self.cells[idx] | BLOCKED)
+
+    def revert(self, journal: list):
+        """
+        Откатывает изменения, записанные в журнал.
+
+        Args:
+            journal (list((int, int))): Журнал изменений.
+        """
+        cells = self.cells
+        for idx, value in reversed(journal):
+            old = cells[idx]
+            self.hash ^= self.cell_hash(idx, old ^ value)
+            self.free += (value == EMPTY) - (old == EMPTY)
+            cells[idx] = value
+            if self.tracking:
+                self.touch(idx, old, value)
+
+    def apply(self, changes: list):
+        """
+        Записывает в клетки готовые значения без журнала.
+
+        Args:
+            changes (list((int, int))): Пары (индекс, новое значение).
+        """
+        cells = self.cells
+        for idx, value in changes:
+            old = cells[idx]
+            self.hash ^= self.cell_hash(idx, old ^ value)
+            self.free += (value == EMPTY) - (old == EMPTY)
+            cells[idx] = value
+            if self.tracking:
+                self.touch(idx, old, value)
+
+    def free_count(self):
+        """
+        Возвращает количество клеток, куда ещё можно поставить точку.
+        """
+        return self.free
+
+    def find(self, mask: int, value: int):
+        """
+        Возвращает координаты всех клеток,
+        у которых cells & mask == value.
+
+        Args:
+            mask (int): Маска состояния.
+            value (int): Значение состояния после наложения маски.
+
+        Returns:
+            list((int, int)): Массив точек.
+        """
+        linesY = self.linesY
+        return [divmod(idx, linesY)
+                for idx, cell in enumerate(self.cells)
+                if cell & mask == value]
+
+    def dots(self, player: int):
+        """
+        Возвращает активные точки игрока.
+        """
+        return self.find(OWNER | CAPTURED, player + 1)
+
+    def occupied_dots(self, player: int):
+        """
+        Возвращает захваченные точки игрока.
+        """
+        return self.find(OWNER | CAPTURED, player + 1 | CAPTURED)
+
+    def other_dots(self):
+        """
+        Возвращает клетки внутри окружённых зон.
+        """
+        return self.find(BLOCKED, BLOCKED)
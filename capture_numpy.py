@@ -0,0 +1,110 @@
+#  Поиск окружённых зон на массивах NumPy.
+#  NumPy не обязателен: если он не установлен, этот способ
+#  проверки окружения недоступен, а игра работает без него.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from board import OWNER, CAPTURED
+
+
+def available():
+    """
+    Проверяет, установлен ли NumPy.
+    """
+    return np is not None
+
+
+def spread(mask, allowed):
+    """
+    Расширяет маску на соседей по четырём направлениям,
+    пока она растёт, не выходя за allowed.
+
+    Args:
+        mask (np.ndarray): Начальная маска.
+        allowed (np.ndarray): Клетки, куда можно расширяться.
+
+    Returns:
+        np.ndarray: Итоговая маска.
+    """
+    count = int(mask.sum())
+    while True:
+        grown = mask.copy()
+        grown[1:, :] |= mask[:-1, :]
+        grown[:-1, :] |= mask[1:, :]
+        grown[:, 1:] |= mask[:, :-1]
+        grown[:, :-1] |= mask[:, 1:]
+        grown &= allowed
+        new_count = int(grown.sum())
+        if new_count == count:
+            return grown
+        mask, count = grown, new_count
+
+
+def label(mask):
+    """
+    Размечает компоненты связности маски: каждой клетке
+    присваивается наименьший индекс клетки её компоненты.
+
+    Args:
+        mask (np.ndarray): Маска клеток.
+
+    Returns:
+        np.ndarray: Метки, вне маски - размер поля.
+    """
+    size = mask.size
+    labels = np.where(
+        mask, np.arange(size).reshape(mask.shape), size)
+    while True:
+        low = labels.copy()
+        np.minimum(low[1:, :], labels[:-1, :], out=low[1:, :])
+        np.minimum(low[:-1, :], labels[1:, :], out=low[:-1, :])
+        np.minimum(low[:, 1:], labels[:, :-1], out=low[:, 1:])
+        np.minimum(low[:, :-1], labels[:, 1:], out=low[:, :-1])
+        low[~mask] = size
+        if np.array_equal(low, labels):
+            return labels
+        labels = low
+
+
+def enclosed_components(board, current: int):
+    """
+    Находит все окружённые игроком зоны, в которых есть
+    точка противника или захваченная точка самого игрока.
+    Достижимость от рамки считается расширением маски
+    сразу по всему полю, а зоны размечаются так же.
+
+    Args:
+        board (Board): Игровое поле.
+        current (int): Текущий игрок.
+
+    Returns:
+        list(set(int)): Зоны в виде множеств индексов клеток.
+    """
+    enemy = (current + 1) % 2
+    cells = np.frombuffer(board.cells, dtype=np.uint8).reshape(
+        board.linesX, board.linesY)
+    state = cells & (OWNER | CAPTURED)
+    free = state != current + 1
+
+    reach = np.zeros_like(free)
+    reach[0, :] = free[0, :]
+    reach[-1, :] = free[-1, :]
+    reach[:, 0] = free[:, 0]
+    reach[:, -1] = free[:, -1]
+    enclosed = free & ~spread(reach, free)
+
+    targets = enclosed & ((state == enemy + 1) |
+                          (state == current + 1 | CAPTURED))
+    if not targets.any():
+        return []
+
+    #  Размечаются только зоны, где есть что захватывать.
+    zones = spread(targets, enclosed)
+    labels = label(zones).ravel()
+    flat = np.flatnonzero(zones.ravel())
+    components = {}
+    for idx, mark in zip(flat.tolist(), labels[flat].tolist()):
+        components.setdefault(mark, set()).add(idx)
+    return list(components.values())
@@ -0,0 +1,15 @@
+def parse_size(text: str):
+    """
+    Разбирает размер поля вида 39x32 для аргументов командной строки.
+
+    Args:
+        text (str): Размер поля.
+
+    Returns:
+        (int, int): Количество точек по ОХ и по ОУ.
+
+    Raises:
+        ValueError: Строка не является размером поля.
+    """
+    x, y = text.lower().split("x")
+    return int(x), int(y)
@@ -1,54 +1,226 @@
+import copy
 import random
-from copy import deepcopy
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import properties
+from engine import simulate, Evaluations
+from mcts import MCTS
+from alphabeta import AlphaBeta
 
 
 class Computer:
-    def __init__(self, robot_mode: int):
+    def __init__(
+            self, robot_mode: int,
+            workers: int = properties.COMPUTER_WORKERS,
+            think_time: float = properties.THINK_TIME,
+            depth: int = properties.SEARCH_DEPTH,
+            defence_priority: float = properties.DEFENCE_PRIORITY,
+            attack_priority: float = properties.ATTACK_PRIORITY,
+            check_area: int = properties.CHECK_AREA):
+        #  0 - случайные ходы, 1 - умный, 2 - поиск Монте-Карло,
+        #  3 - перебор с альфа-бета отсечением.
         self.robot_mode = robot_mode
+        #  Настройки умного компьютера.
+        self.defence_priority = defence_priority
+        self.attack_priority = attack_priority
+        self.check_area = check_area
+        #  Настройки поиска, чтобы их можно было сохранить.
+        self.think_time = think_time
+        self.depth = depth
+        #  Оценки ходов умного компьютера с прошлых ходов.
+        #  Копия компьютера в потоке пользуется ими же.
+        self.evaluations = Evaluations()
         self.game = None
+        #  Флаг досрочной остановки поиска.
+        self.stop = threading.Event()
+        #  Поиск Монте-Карло с ограничением времени на ход.
+        self.mcts = MCTS(think_time, stop=self.stop, check_area=check_area)
+        #  Перебор с таблицей транспозиций.
+        #  Таблица сохраняется между ходами.
+        self.alphabeta = AlphaBeta(
+            depth, think_time, stop=self.stop, check_area=check_area,
+            defence_priority=defence_priority,
+            attack_priority=attack_priority)
+        #  Поток, в котором считается ход, и его результат.
+        self.thread = None
+        self.result = None
+        #  Количество процессов для оценки ходов.
+        #  0 или 1 - оценка в текущем процессе.
+        self.workers = workers
+        #  Пул процессов, создаётся при первой необходимости.
+        self.pool = None
+
+    def settings(self):
+        """
+        Возвращает настройки компьютера, кроме уровня и числа
+        процессов, в виде аргументов Computer.
+
+        Returns:
+            dict: Настройки.
+        """
+        return {
+            "think_time": self.think_time,
+            "defence_priority": self.defence_priority,
+            "attack_priority": self.attack_priority,
+            "depth": self.depth,
+            "check_area": self.check_area,
+        }
 
     def load_game(self, game):
         self.game = game
 
-    def move(self, player_pos: int = None):
-        if self.robot_mode == 0:
-            return self.random_move()
-        else:
-            return self.smart_move(player_pos)
+    def think(self, player_pos: tuple, callback=None):
+        """
+        Начинает считать ход в отдельном потоке.
+        Ход считается на копии игры, поэтому саму игру
+        можно рисовать, пока компьютер думает.
+
+        Args:
+            player_pos ((int, int)): Последний ход игрока.
+            callback (optional): Вызывается из потока, когда ход готов.
+        """
+        self.cancel()
+        if self.workers >= 2 and self.pool is None:
+            #  Пул создаётся заранее, чтобы копия компьютера
+            #  в потоке пользовалась им же.
+            self.pool = ProcessPoolExecutor(self.workers)
+        worker = copy.copy(self)
+        worker.game = self.game.copy()
+
+        def run():
+            self.result = worker.move(player_pos)
+            if callback is not None and not self.stop.is_set():
+                callback()
+
+        self.result = None
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def is_thinking(self):
+        """
+        Проверяет, считается ли сейчас ход.
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def is_ready(self):
+        """
+        Проверяет, готов ли ход, начатый через think.
+        """
+        return self.thread is not None and not self.thread.is_alive()
+
+    def take(self):
+        """
+        Забирает готовый ход.
+
+        Returns:
+            (int, int): Пара (X, Y) или None, если ходить некуда.
+        """
+        self.thread.join()
+        self.thread = None
+        return self.result
+
+    def cancel(self):
+        """
+        Останавливает подсчёт хода и забывает результат.
+        Поиски и оценка ходов умного компьютера проверяют
+        флаг остановки сами, так что поток заканчивается быстро.
+        В пуле процессов дорабатывают уже отправленные части,
+        каждая из которых в workers раз меньше всего перебора.
+        """
+        if self.thread is not None:
+            self.stop.set()
+            self.thread.join()
+            self.thread = None
+            self.result = None
+        self.stop.clear()
+
+    def close(self):
+        """
+        Останавливает подсчёт хода и пул процессов,
+        если они были запущены.
+        """
+        self.cancel()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
 
-    def get_neighbours(self, x: int, y: int):
+    def evaluate(self, possible_pos: list, computer: int, player: int):
         """
-        Возвращает список незанятых точек по соседству с точкой.
+        Считает прирост счёта игрока и компьютера для каждой точки.
+        Оценки, не устаревшие с прошлых ходов, берутся из
+        self.evaluations, симулируются только остальные точки.
+
         Args:
-            x (int): Х координата.
-            y (int): У координата.
+            possible_pos (list((int, int))): Список точек.
+            computer (int): Номер компьютера.
+            player (int): Номер игрока.
 
         Returns:
-            list((int, int)): Список пар (X, Y).
+            list((int, int)): Прирост счёта игрока и компьютера
+            или None, если подсчёт хода остановлен.
         """
-        #  Список для генерации координат соседних клеток.
-        moves8 = [[-1, -1], [-1, 1], [1, -1], [1, 1],
-                  [-1, 0], [0, -1], [0, 1], [1, 0]]
-        result = []
-        computer = self.game.turn
-        player = (self.game.turn + 1) % 2
+        evaluations = self.evaluations
+        if not evaluations.sync(self.game):
+            gains = self.simulate(possible_pos, computer, player)
+            return None if self.stop.is_set() else gains
+
+        board = self.game.board
+        keys = [(board.index(pos), computer) for pos in possible_pos]
+        gains = [evaluations.get(key) for key in keys]
+        missing = [i for i, gain in enumerate(gains) if gain is None]
+        fresh = self.simulate(
+            [possible_pos[i] for i in missing], computer, player, True)
+        for i, (gain, reads) in zip(missing, fresh):
+            evaluations.put(keys[i], gain, reads)
+            gains[i] = gain
+        return None if self.stop.is_set() else gains
+
+    def simulate(self, possible_pos: list, computer: int, player: int,
+                 watch: bool = False):
+        """
+        Симулирует ходы в точки (см. engine.simulate).
+        Если разрешено несколько процессов, точки делятся на
+        части и оцениваются параллельно на копиях игры без окна.
+        Результаты собираются в исходном порядке точек,
+        поэтому выбор хода не зависит от числа процессов.
 
-        #  Перебор соседних клеток и их проверка.
-        for ax, ay in moves8:
-            nx, ny = x + ax, y + ay
-            if (nx < 0 or nx >= self.game.linesX or
-                    ny < 0 or ny >= self.game.linesY):
-                continue
-            dot = (nx, ny)
-            if (dot not in self.game.dots[computer] and
-                    dot not in self.game.dots[player] and
-                    dot not in self.game.occupied_dots[computer] and
-                    dot not in self.game.occupied_dots[player] and
-                    dot not in self.game.other_dots):
-                result.append(dot)
+        Args:
+            possible_pos (list((int, int))): Список точек.
+            computer (int): Номер компьютера.
+            player (int): Номер игрока.
+            watch (bool): Возвращать ли пройденные клетки.
+
+        Returns:
+            list: Результаты engine.simulate для каждой точки.
+        """
+        if self.workers < 2 or len(possible_pos) < 2 * self.workers:
+            return simulate(self.game, possible_pos, computer, player,
+                            watch, self.stop)
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+        state = self.game.copy()
+        size = -(-len(possible_pos) // self.workers)
+        parts = [possible_pos[i:i + size]
+                 for i in range(0, len(possible_pos), size)]
+        result = []
+        for part in self.pool.map(
+                simulate, repeat(state), parts,
+                repeat(computer), repeat(player), repeat(watch)):
+            result.extend(part)
         return result
 
+    def move(self, player_pos: int = None):
+        if self.robot_mode == 0:
+            return self.random_move()
+        elif self.robot_mode == 1:
+            return self.smart_move(player_pos)
+        elif self.robot_mode == 2:
+            return self.mcts.search(self.game, player_pos)
+        else:
+            return self.alphabeta.search(self.game, player_pos)
+
     def get_possible_pos(self):
         """
         Возвращает список всех незанятых точек
@@ -57,17 +229,9 @@ class Computer:
         Returns:
             list((int, int)): Список пар (X, Y).
         """
-        #  Множество незанятых точек.
-        #  Используется Set так как могут быть повторения.
-        possible_pos = set()
+        board = self.game.board
         player = (self.game.turn + 1) % 2
-        #  Перебор точек игрока.
-        #  Добавление подходящих соседних точек в множество.
-        for x, y in self.game.dots[player]:
-            neigh = self.get_neighbours(x, y)
-            for dot in neigh:
-                possible_pos.add(dot)
-        return list(possible_pos)
+        return [board.pos(idx) for idx in board.candidates(player)]
 
     def random_move(self):
         """Выбирает случайную точку из списка незанятых точек.
@@ -95,48 +259,21 @@ class Computer:
         computer = self.game.turn
         player = (self.game.turn + 1) % 2
 
-        #  Список всех незанятых точек по соседству со всеми точками игрока.
-        pre_possible_pos = self.get_possible_pos()
-        if not pre_possible_pos:
+        #  Выбирает незанятые точки по соседству с точками игрока,
+        #  расстояние до которых не более CHECK_AREA
+        #  от последнего хода игрока.
+        #  Если не находит подходящих точек, то зона поиска расширяется.
+        board = self.game.board
+        possible_pos = [
+            board.pos(idx) for idx in board.candidates_near(
+                player, board.index(player_pos), self.check_area)]
+        if not possible_pos:
             return None
 
-        #  Выбирает точки, расстояние до которых не более
-        #  CHECK_AREA от последнего хода игрока.
-        #  Если не находит подходящих точек, то зона поиска расширяется.
-        max_value = max(self.game.linesX, self.game.linesY) * 2
-        possible_pos = []
-        searching_zone = properties.CHECK_AREA
-        while not possible_pos:
-            for x, y in pre_possible_pos:
-                if (abs(x - player_pos[0]) <= searching_zone and
-                        abs(y - player_pos[1]) <= searching_zone):
-                    possible_pos.append((x, y))
-            searching_zone += 1
-            if searching_zone > max_value:
-                #  В теории случиться не должно.
-                #  Можно добиться этой ошибки, подключив компьютер к песочнице.
-                raise ValueError("Зона поиска слишком большая")
-
-        #  Функция, сохраняющая текущее состояние игры в единичном экземпляре.
-        def save_prev():
-            self.prev_turn = self.game.turn
-            self.prev_dots = deepcopy(self.game.dots)
-            self.prev_occupied_dots = deepcopy(self.game.occupied_dots)
-            self.prev_other_dots = deepcopy(self.game.other_dots)
-            self.prev_polygons = self.game.polygons.copy()
-            self.prev_score = self.game.score.copy()
-
-        #  Функция загрузки сохранённого состояния игры.
-        def load_prev():
-            self.game.turn = self.prev_turn
-            self.game.dots = self.prev_dots
-            self.game.occupied_dots = self.prev_occupied_dots
-            self.game.other_dots = self.prev_other_dots
-            self.game.polygons = self.prev_polygons
-            self.game.score = self.prev_score
-
-        #  Текущий счёт игрока.
-        currscore = self.game.score[player]
+        #  Прирост счёта игрока и компьютера для каждой точки.
+        gains = self.evaluate(possible_pos, computer, player)
+        if gains is None:
+            return None
 
         #  Массив возможных ходов с коэфицентами эффективности. (int, dot)
         actions = []
@@ -145,44 +282,19 @@ class Computer:
         #  если он поставит точку в dot.
         #  Если счёт игрока повышается,
         #  то компьютер может поставить туда точку, чтобы помешать.
-        for dot in possible_pos:
-            #  Сохранение текущего состояния.
-            save_prev()
-            #  Иммитация хода игрока.
-            self.game.turn += 1
-            self.game.turn %= 2
-            self.game.put_dot(dot, history_lock=True)
-            #  Разница между счётом игрока до и после иммитации его хода.
-            res = self.game.score[player] - currscore
-            #  Загрузка текущего состяния.
-            load_prev()
-            #  Если счёт игрока повысился,
-            #  то ход записывается в возможные действия.
-            #  Коэфицент эффективности = res * DEFENCE_PRIORITY
+        #  Коэфицент эффективности = res * DEFENCE_PRIORITY
+        for dot, (res, _) in zip(possible_pos, gains):
             if res > 0:
-                actions.append((res * properties.DEFENCE_PRIORITY, dot))
-
-        #  Текущий счёт компьютера.
-        currscore = self.game.score[computer]
+                actions.append((res * self.defence_priority, dot))
 
         #  Рассматривает, повысится ли счёт компьютера,
         #  если он поставит точку в dot.
         #  Если счёт компьютера повышается,
         #  то компьютер может поставить туда точку.
-        for dot in possible_pos:
-            #  Сохранение текущего состояния.
-            save_prev()
-            #  Иммитация хода игрока.
-            self.game.put_dot(dot, history_lock=True)
-            #  Разница между счётом компьютера до и после иммитации его хода.
-            res = self.game.score[computer] - currscore
-            #  Загрузка текущего состяния.
-            load_prev()
-            #  Если счёт компьютера повысился,
-            #  то ход записывается в возможные действия.
-            #  Коэфицент эффективности = res * DEFENCE_PRIORITY
+        #  Коэфицент эффективности = res * ATTACK_PRIORITY
+        for dot, (_, res) in zip(possible_pos, gains):
             if res > 0:
-                actions.append((res * properties.ATTACK_PRIORITY, dot))
+                actions.append((res * self.attack_priority, dot))
 
         if not actions:
             #  Если никаких умных действий не нашлось,
@@ -0,0 +1,778 @@
+from collections import deque
+import properties
+import capture_numpy
+from board import Board, OWNER, CAPTURED
+
+
+BLUE_PLAYER = 0
+RED_PLAYER = 1
+
+
+class Delta:
+    """
+    Изменения, внесённые одним ходом.
+    Хранит только то, что нужно для отката хода:
+    старые значения изменённых клеток, счёт, очередь
+    перепроверки и число многоугольников до хода.
+    После seal также хранит состояние после хода для redo.
+    """
+    __slots__ = (
+        "pos", "turn", "score", "pending", "polygons", "cells",
+        "after", "new_polygons", "score_after", "pending_after",
+        "turn_after")
+
+    def __init__(self, state, pos: tuple):
+        """
+        Запоминает состояние игры перед ходом.
+
+        Args:
+            state (GameState): Состояние игры.
+            pos ((int, int)): Координаты точки.
+        """
+        self.pos = pos
+        self.turn = state.turn
+        self.score = tuple(state.score)
+        self.pending = [state.pending[0].copy(), state.pending[1].copy()]
+        self.polygons = len(state.polygons)
+        #  Журнал изменённых клеток (индекс, старое значение).
+        self.cells = []
+
+    def seal(self, state):
+        """
+        Запоминает состояние игры после хода,
+        чтобы ход можно было повторить для redo.
+
+        Args:
+            state (GameState): Состояние игры сразу после хода.
+        """
+        cells = state.board.cells
+        self.after = [(idx, cells[idx]) for idx, _ in self.cells]
+        self.new_polygons = state.polygons[self.polygons:]
+        self.score_after = tuple(state.score)
+        self.pending_after = [state.pending[0].copy(),
+                              state.pending[1].copy()]
+        self.turn_after = state.turn
+
+
+def simulate(game, possible_pos: list, computer: int, player: int,
+             watch: bool = False, stop=None):
+    """
+    Для каждой точки иммитирует ход в неё сначала игрока,
+    потом компьютера, и считает, на сколько вырастет
+    счёт сходившего.
+    Функция на уровне модуля, чтобы её можно было
+    запускать в пуле процессов.
+
+    Args:
+        game (GameState): Состояние игры.
+        possible_pos (list((int, int))): Список точек.
+        computer (int): Номер компьютера.
+        player (int): Номер игрока.
+        watch (bool): Возвращать ли вместе с приростом клетки,
+        пройденные поиском окружений (для Evaluations).
+        stop (threading.Event, optional): Флаг досрочной остановки.
+        Если он поднят, то оцениваются не все точки.
+
+    Returns:
+        list((int, int)): Прирост счёта игрока и компьютера.
+        С watch - пары из прироста и множества клеток.
+    """
+    result = []
+    #  Ходы сразу откатываются, кандидаты компьютера не меняются.
+    game.board.tracking = False
+    try:
+        for dot in possible_pos:
+            if stop is not None and stop.is_set():
+                break
+            if watch:
+                game.reads = set()
+            gain = []
+            for who in (player, computer):
+                #  Счёт до иммитации хода.
+                currscore = game.score[who]
+                #  Иммитация хода.
+                delta = game.make_move(dot, who)
+                gain.append(game.score[who] - currscore)
+                #  Откат хода.
+                game.unmake_move(delta)
+            result.append((tuple(gain), game.reads) if watch
+                          else tuple(gain))
+    finally:
+        game.board.tracking = True
+        game.reads = None
+    return result
+
+
+class Evaluations:
+    """
+    Оценки ходов умного компьютера, которые переживают ход.
+    Для каждой точки хранится прирост счёта игрока и компьютера
+    и клетки, пройденные поиском окружений при симуляции.
+    Поиск читает только их и их соседей, поэтому, пока ни одна
+    из этих клеток не изменилась, симуляция дала бы тот же
+    прирост. Перед оценкой поле сравнивается со снимком
+    с прошлого раза, и забываются только оценки,
+    задетые изменившимися клетками.
+    """
+
+    def __init__(self):
+        #  Поле на момент прошлой оценки.
+        self.cells = None
+        self.linesY = None
+        #  (точка, компьютер) -> (прирост, пройденные клетки).
+        self.entries = {}
+        #  Счётчики для подбора настроек.
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def changed(self, board: Board):
+        """
+        Находит клетки, изменившиеся с прошлой оценки,
+        вместе с их соседями. Поле сравнивается кусками,
+        и по клеткам перебираются только несовпавшие куски.
+
+        Args:
+            board (Board): Текущее поле.
+
+        Returns:
+            set(int): Индексы клеток.
+        """
+        old = self.cells
+        cells = board.cells
+        step = 64
+        result = set()
+        for start in range(0, len(cells), step):
+            end = start + step
+            if old[start:end] != cells[start:end]:
+                for idx in range(start, min(end, len(cells))):
+                    if old[idx] != cells[idx]:
+                        result.add(idx)
+                        result.update(board.sides[idx])
+        return result
+
+    def sync(self, game):
+        """
+        Забывает оценки, которые могли измениться с прошлого раза.
+
+        Args:
+            game (GameState): Состояние игры.
+
+        Returns:
+            bool: Можно ли сейчас брать и записывать оценки.
+        """
+        board = game.board
+        if (self.cells is None or self.linesY != board.linesY or
+                len(self.cells) != len(board.cells)):
+            self.entries = {}
+        elif self.cells != board.cells:
+            changed = self.changed(board)
+            stale = [key for key, (_, reads) in self.entries.items()
+                     if not reads.isdisjoint(changed)]
+            for key in stale:
+                del self.entries[key]
+            self.invalidated += len(stale)
+        self.cells = bytes(board.cells)
+        self.linesY = board.linesY
+        #  Непроверенные клетки из self.pending тоже влияют
+        #  на прирост, а NumPy не сообщает пройденных клеток.
+        return game.backend != "numpy" and not any(game.pending)
+
+    def get(self, key: tuple):
+        """
+        Ищет оценку точки.
+
+        Args:
+            key ((int, int)): Индекс точки и номер компьютера.
+
+        Returns:
+            (int, int): Прирост счёта игрока и компьютера
+            или None, если оценки нет.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: tuple, gain: tuple, reads: set):
+        """
+        Записывает оценку точки.
+
+        Args:
+            key ((int, int)): Индекс точки и номер компьютера.
+            gain ((int, int)): Прирост счёта игрока и компьютера.
+            reads (set(int)): Клетки, пройденные поиском окружений.
+        """
+        self.entries[key] = (gain, reads)
+
+    def stats(self):
+        """
+        Возвращает счётчики оценок.
+
+        Returns:
+            dict: Размер, попадания, промахи, забытые оценки
+            и доля попаданий.
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def trace_wall(component: set, linesY: int):
+    """
+    Обходит стену вокруг окружённой зоны по её внешнему контуру.
+    Обход идёт по рёбрам между клетками зоны и стенами,
+    так что зона всегда справа, а стена слева. Каждое ребро
+    проходится один раз, поэтому время пропорционально длине
+    контура, а точки сразу идут по часовой стрелке.
+    Точки игрока внутри зоны в контур не попадают.
+
+    Args:
+        component (set(int)): Окружённая зона.
+        linesY (int): Количество точек по ОУ.
+
+    Returns:
+        list((int, int)): Точки стены по порядку.
+    """
+    #  Сдвиги индекса: вправо, вниз, влево, вверх.
+    #  Следующее направление - поворот по часовой стрелке.
+    steps = (linesY, 1, -linesY, -1)
+    #  Слева от самой левой клетки зоны - стена внешнего контура.
+    start = min(component)
+    cell, side = start, 2
+    walls = []
+    while True:
+        wall = cell + steps[side]
+        if not walls or walls[-1] != wall:
+            walls.append(wall)
+        #  Движение вдоль ребра: стена слева, зона справа.
+        move = (side + 1) % 4
+        ahead = cell + steps[move]
+        if ahead not in component:
+            #  Выпуклый угол зоны: поворот направо.
+            side = move
+        elif ahead + steps[side] in component:
+            #  Вогнутый угол: поворот налево на соседнюю клетку.
+            cell = ahead + steps[side]
+            side = (side + 3) % 4
+        else:
+            cell = ahead
+        if cell == start and side == 2:
+            break
+    if len(walls) > 1 and walls[0] == walls[-1]:
+        walls.pop()
+    return [divmod(idx, linesY) for idx in walls]
+
+
+class Cover:
+    """
+    Многоугольник вокруг захваченной зоны.
+    При захвате запоминается только сама зона, а точки
+    многоугольника считаются при первом обращении, то есть
+    когда его рисуют. Симуляции ходов их не считают вовсе.
+    """
+    __slots__ = ("component", "color", "linesY", "polygon")
+
+    def __init__(self, component: set, color: int, linesY: int):
+        """
+        Args:
+            component (set(int)): Окружённая зона.
+            color (int): Игрок, который окружил зону.
+            linesY (int): Количество точек по ОУ.
+        """
+        self.component = component
+        self.color = color
+        self.linesY = linesY
+        self.polygon = None
+
+    def points(self):
+        """
+        Возвращает точки многоугольника по часовой стрелке.
+
+        Returns:
+            list((int, int)): Точки стены по порядку.
+        """
+        if self.polygon is None:
+            self.polygon = trace_wall(self.component, self.linesY)
+            #  Зона больше не нужна.
+            self.component = None
+        return self.polygon
+
+
+class GameState:
+    """
+    Логика игры без отрисовки: поле, счёт, ходы и история.
+    Не зависит от pygame, поэтому годится для симуляций,
+    компьютера и серверов.
+    """
+    def __init__(
+        self,
+        linesX: int = 39, linesY: int = 32,
+        game_mode: str = "PVP",
+            backend: str = properties.CAPTURE_BACKEND):
+        """
+        Инициализирует состояние игры.
+        """
+        if backend not in ("python", "numpy", "verify"):
+            raise ValueError(f"Неизвестный способ проверки: {backend}")
+        if backend != "python" and not capture_numpy.available():
+            raise ImportError(f"Для способа {backend} нужен numpy")
+
+        #  Количество точек по ОХ.
+        self.linesX = linesX
+        #  Количество точек по ОY.
+        self.linesY = linesY
+        #  Режим игры.
+        self.game_mode = game_mode
+        #  Способ поиска окружённых зон.
+        self.backend = backend
+
+        #  Чей ход.
+        self.turn = BLUE_PLAYER
+        #  Игровое поле: активные и захваченные точки,
+        #  а также клетки, куда ходить нельзя.
+        self.board = Board(linesX, linesY)
+        #  Список многоугольников (Cover).
+        self.polygons = []
+        #  Клетки, которые нужно перепроверить при следующей
+        #  проверке окружения каждым из игроков.
+        self.pending = [set(), set()]
+        #  Счёт игроков.
+        self.score = [0, 0]
+
+        #  Массив для undo. Каждая запись - список изменений
+        #  от ходов между двумя сохранениями.
+        #  Самые старые записи забываются.
+        self.history_undo = deque(maxlen=properties.HISTORY_SIZE)
+        #  Массив для redo.
+        self.history_redo = []
+        #  Ходы, ещё не записанные в историю.
+        self.unsaved = []
+        #  Все ходы партии для её записи: пары (игрок, точка).
+        #  Ходы симуляций сюда не попадают.
+        self.moves = []
+        #  Если это множество, поиск окружений добавляет в него
+        #  пройденные клетки. Нужно для Evaluations.
+        self.reads = None
+
+    def copy(self):
+        """
+        Возвращает копию текущего состояния без истории ходов.
+
+        Returns:
+            GameState: Копия состояния.
+        """
+        state = GameState(
+            self.linesX, self.linesY, self.game_mode, self.backend)
+        state.turn = self.turn
+        state.board = self.board.copy()
+        state.polygons = self.polygons.copy()
+        state.pending = [self.pending[0].copy(), self.pending[1].copy()]
+        state.score = self.score.copy()
+        return state
+
+    def fill(self, current: int, idx: int, open_cells: set):
+        """
+        Обходит в глубину все клетки, связные с клеткой idx
+        и не являющиеся активными точками текущего игрока.
+        Обход прерывается, как только он доходит до рамки поля
+        или до клетки, про которую уже известно, что она
+        достижима от рамки. В этом случае все пройденные клетки
+        добавляются в open_cells.
+
+        Args:
+            current (int): Текущий игрок.
+            idx (int): Индекс клетки.
+            open_cells (set(int)): Клетки, достижимые от рамки.
+
+        Returns:
+            set(int): Окружённая компонента
+            или None, если компонента достижима от рамки.
+        """
+        board = self.board
+        #  Таблицы поля вместо методов: обход - самое частое
+        #  действие при поиске окружений.
+        cells = board.cells
+        sides = board.sides
+        edge = board.edge
+        dot = current + 1
+        component = {idx}
+        stack = [idx]
+        while stack:
+            cell = stack.pop()
+            if edge[cell] or cell in open_cells:
+                open_cells.update(component)
+                if self.reads is not None:
+                    #  Ответ зависит только от пути до рамки,
+                    #  а он проходит по уже снятым со стека клеткам.
+                    self.reads.update(component.difference(stack))
+                return None
+            for neigh in sides[cell]:
+                if (neigh not in component and
+                        cells[neigh] & (OWNER | CAPTURED) != dot):
+                    component.add(neigh)
+                    stack.append(neigh)
+        return component
+
+    def build_cover(
+            self, current: int, component: set):
+        """
+        Блокирует захваченную зону и запоминает оболочку вокруг неё.
+        Точки оболочки считаются позже, только если её рисуют.
+
+        Args:
+            current (int): Текущий игрок.
+            component (set(int)): Окружённая зона.
+        """
+        #  Блокирует пустые клетки,
+        #  которые попали в оккупированную зону.
+        for idx in component:
+            self.board.block(idx)
+
+        self.polygons.append(
+            Cover(component, current, self.board.linesY))
+
+    def find_components(self, current: int):
+        """
+        Находит окружённые текущим игроком зоны,
+        в которых могло что-то измениться.
+        Поле целиком не перебирается: обход запускается только
+        от клеток, отмеченных в self.pending, то есть от соседей
+        новых точек игрока и от точек, чьё состояние изменилось
+        с прошлой проверки. Остальные окружённые зоны уже были
+        обработаны раньше.
+
+        Args:
+            current (int): Текущий игрок.
+
+        Returns:
+            list(set(int)): Зоны в виде множеств индексов клеток.
+        """
+        board = self.board
+
+        #  Клетки, от которых запускается обход.
+        starts = []
+        for idx in self.pending[current]:
+            if board.is_dot(idx, current):
+                starts.extend(board.neighbours(idx))
+            else:
+                starts.append(idx)
+
+        #  Клетки, достижимые от рамки, и окружённые компоненты.
+        open_cells = set()
+        seen = set()
+        components = []
+        for idx in starts:
+            if (idx in seen or idx in open_cells or
+                    board.is_dot(idx, current)):
+                continue
+            component = self.fill(current, idx, open_cells)
+            if component is not None:
+                seen.update(component)
+                components.append(component)
+        if self.reads is not None:
+            self.reads.update(starts, seen)
+        return components
+
+    def check(self, current: int):
+        """
+        Проверяет не окружил ли текущий игрок соперника.
+        Если зона не достижима от рамки поля, то она окружена,
+        и все точки противника в ней объявляются захваченными.
+        Зоны ищутся способом из self.backend:
+        "python" - обходом от изменившихся клеток,
+        "numpy" - по всему полю на массивах NumPy,
+        "verify" - обоими способами со сверкой результатов.
+
+        Args:
+            current (int): Текущий игрок.
+        """
+        board = self.board
+        enemy = (current + 1) % 2
+
+        if self.backend == "numpy":
+            components = capture_numpy.enclosed_components(board, current)
+        else:
+            components = self.find_components(current)
+            if self.backend == "verify":
+                self.verify(current, components)
+        self.pending[current] = set()
+        seen = set().union(*components)
+
+        """
+        Перебираются окружённые клетки в порядке обхода поля.
+        Точки противника объявляются захваченными.
+        Также из под захвата освобождаются собственные точки.
+        Изменившиеся клетки запоминаются для следующих проверок.
+        """
+        captured = set()
+        for idx in sorted(seen):
+            if board.is_dot(idx, enemy):
+                captured.add(idx)
+                board.capture(idx)
+                self.score[current] += 1
+                self.pending[enemy].add(idx)
+            elif board.is_occupied(idx, current):
+                board.release(idx)
+                self.score[enemy] -= 1
+                self.pending[current].add(idx)
+                self.pending[enemy].add(idx)
+
+        """
+        Вокруг каждой компоненты, в которой оказалась
+        точка противника, независимо строится многоугольник.
+        Компоненты перебираются в порядке первой захваченной точки.
+        """
+        order = []
+        for component in components:
+            first = min(component & captured, default=None)
+            if first is not None:
+                order.append((first, component))
+        for _, component in sorted(order, key=lambda item: item[0]):
+            self.build_cover(current, component)
+
+    def verify(self, current: int, components: list):
+        """
+        Сверяет зоны, найденные обходом, с поиском на NumPy.
+        Сравниваются только зоны, где есть что захватывать
+        или освобождать: остальные ни на что не влияют.
+
+        Args:
+            current (int): Текущий игрок.
+            components (list(set(int))): Зоны, найденные обходом.
+
+        Raises:
+            RuntimeError: Способы дали разный результат.
+        """
+        board = self.board
+        enemy = (current + 1) % 2
+
+        def key(zones):
+            return sorted(
+                sorted(zone) for zone in zones
+                if any(board.is_dot(idx, enemy) or
+                       board.is_occupied(idx, current) for idx in zone))
+
+        expected = key(capture_numpy.enclosed_components(board, current))
+        if key(components) != expected:
+            raise RuntimeError(
+                f"Поиск окружений расходится с NumPy у игрока {current}")
+
+    def is_free(self, pos: tuple):
+        """
+        Проверяет, свободна ли точка.
+
+        Args:
+            pos ((int, int)): Координаты точки.
+
+        Returns:
+            bool: Результат проверки.
+        """
+        return self.board.is_free(self.board.index(pos))
+
+    @property
+    def dots(self):
+        """
+        Списки активных точек игроков.
+        """
+        return [self.board.dots(BLUE_PLAYER), self.board.dots(RED_PLAYER)]
+
+    @property
+    def occupied_dots(self):
+        """
+        Списки захваченных точек игроков.
+        """
+        return [self.board.occupied_dots(BLUE_PLAYER),
+                self.board.occupied_dots(RED_PLAYER)]
+
+    @property
+    def other_dots(self):
+        """
+        Клетки внутри окружённых зон.
+        """
+        return self.board.other_dots()
+
+    def save_current(self):
+        """
+        Сохраняет текущее состояние игры.
+        В историю записываются не копии поля, а изменения,
+        сделанные ходами с прошлого сохранения.
+        """
+        if self.game_mode == "ONLINE":
+            return
+        self.history_redo = []
+        self.history_undo.append(self.unsaved)
+        self.unsaved = []
+
+    def can_undo(self):
+        """
+        Проверяет, изменит ли что-нибудь undo.
+        """
+        return self.game_mode != "ONLINE" and len(self.history_undo) >= 2
+
+    def can_redo(self):
+        """
+        Проверяет, изменит ли что-нибудь redo.
+        """
+        return self.game_mode != "ONLINE" and bool(self.history_redo)
+
+    def undo(self):
+        """
+        Возвращает состояние игры к предыдущему.
+        """
+        if self.can_undo():
+            self.drop_unsaved()
+            note = self.history_undo.pop()
+            for delta in reversed(note):
+                self.unmake_move(delta)
+            del self.moves[len(self.moves) - len(note):]
+            self.history_redo.append(note)
+
+    def redo(self):
+        """
+        Возвращает состояние игры к новому, после undo.
+        """
+        if self.can_redo():
+            self.drop_unsaved()
+            note = self.history_redo.pop()
+            for delta in note:
+                self.remake_move(delta)
+                self.moves.append((delta.turn, delta.pos))
+            self.history_undo.append(note)
+
+    def drop_unsaved(self):
+        """
+        Отменяет ходы, сделанные после последнего сохранения.
+        """
+        for delta in reversed(self.unsaved):
+            self.unmake_move(delta)
+        del self.moves[len(self.moves) - len(self.unsaved):]
+        self.unsaved = []
+
+    def make_move(self, pos: tuple, player: int = None):
+        """
+        Совершает ход без записи в историю
+        и возвращает изменения, которые он внёс.
+
+        Args:
+            pos ((int, int)): Координаты точки.
+            player (int, optional): Кто ходит.
+            Defaults to None - тот, чей сейчас ход.
+
+        Returns:
+            Delta: Изменения, сделанные ходом.
+        """
+        delta = Delta(self, pos)
+        if player is not None:
+            self.turn = player
+        self.board.journal = delta.cells
+
+        #  Добвляется к активным точкам текущего игрока.
+        idx = self.board.index(pos)
+        self.board.put(idx, self.turn)
+        #  Новая точка может замкнуть окружение текущего игрока
+        #  или попасть в окружение противника.
+        self.pending[self.turn].add(idx)
+        self.pending[(self.turn + 1) % 2].add(idx)
+
+        #  Проверяет окружил ли текущий игрок противника.
+        self.check(self.turn)
+        #  Проверяет не попала ли точка в окружение противника.
+        self.check((self.turn + 1) % 2)
+
+        #  Если режим игры не песочница, то переключает ход.
+        if self.game_mode != "SB":
+            self.turn += 1
+            self.turn %= 2
+
+        self.board.journal = None
+        return delta
+
+    def unmake_move(self, delta):
+        """
+        Отменяет ход, сделанный make_move.
+        Ходы отменяются в обратном порядке.
+
+        Args:
+            delta (Delta): Изменения, сделанные ходом.
+        """
+        self.board.revert(delta.cells)
+        del self.polygons[delta.polygons:]
+        self.score[:] = delta.score
+        self.pending = [delta.pending[0].copy(), delta.pending[1].copy()]
+        self.turn = delta.turn
+
+    def remake_move(self, delta):
+        """
+        Повторяет ход, отменённый unmake_move,
+        не пересчитывая окружения.
+
+        Args:
+            delta (Delta): Изменения, сделанные ходом.
+            Должны быть дополнены методом Delta.seal.
+        """
+        self.board.apply(delta.after)
+        self.polygons.extend(delta.new_polygons)
+        self.score[:] = delta.score_after
+        self.pending = [delta.pending_after[0].copy(),
+                        delta.pending_after[1].copy()]
+        self.turn = delta.turn_after
+
+    def put_dot(self, pos: tuple, history_lock: bool = False):
+        """
+        Совершает ход.
+        То есть тсавит точку и выполняет действия.
+
+        Args:
+            pos ((int, int)): Координаты точки.
+            history_lock (bool, optional):
+            Блокировка записи в историю. Defaults to False.
+        """
+        delta = self.make_move(pos)
+        self.moves.append((delta.turn, delta.pos))
+        if self.game_mode != "ONLINE":
+            delta.seal(self)
+            self.unsaved.append(delta)
+
+        #  Сохраняет текущее состояние игры,
+        #  если нет флага, запрещающего это.
+        if not history_lock:
+            self.save_current()
+
+    def replay(self, moves: list):
+        """
+        Восстанавливает состояние, заново проигрывая ходы
+        с пустого поля. История ходов забывается.
+
+        Args:
+            moves (list((int, (int, int)))): Пары (игрок, точка).
+        """
+        self.turn = BLUE_PLAYER
+        self.board = Board(self.linesX, self.linesY)
+        self.polygons = []
+        self.pending = [set(), set()]
+        self.score = [0, 0]
+        self.history_undo.clear()
+        self.history_redo = []
+        self.unsaved = []
+        self.moves = []
+        for player, pos in moves:
+            self.make_move(pos, player)
+            self.moves.append((player, pos))
+
+    def is_over(self):
+        """
+        Проверяет, закончилась ли игра,
+        то есть не осталось ли свободных точек.
+
+        Returns:
+            bool: Результат проверки.
+        """
+        return self.board.free_count() == 0
@@ -1,4 +1,5 @@
 import pygame
+from functools import lru_cache
 import properties
 
 
@@ -90,7 +91,40 @@ def draw_horizontal_line(screen, color: tuple, y: int, linesX: int):
     pygame.draw.line(screen, color, [xb, yb], [xe, ye])
 
 
-def draw_text(screen, names, score, linesX, game_mode):
+@lru_cache(maxsize=None)
+def get_font(size: int):
+    """
+    Возвращает шрифт courier нужного размера.
+    Поиск системного шрифта делается один раз на размер.
+
+    Args:
+        size (int): Размер шрифта.
+
+    Returns:
+        pygame.font.Font: Шрифт.
+    """
+    return pygame.font.SysFont('courier', size)
+
+
+@lru_cache(maxsize=properties.TEXT_CACHE_SIZE)
+def render_text(size: int, text: str, color: tuple):
+    """
+    Возвращает отрисованный текст.
+    Последние TEXT_CACHE_SIZE надписей хранятся готовыми,
+    давно не использованные вытесняются.
+
+    Args:
+        size (int): Размер шрифта.
+        text (str): Текст.
+        color: Цвет.
+
+    Returns:
+        pygame.Surface: Надпись.
+    """
+    return get_font(size).render(text, 0, color)
+
+
+def draw_text(screen, names, score, linesX, game_mode, status=""):
     """
     Рисует текст в верхнем меню.
 
@@ -99,15 +133,20 @@ def draw_text(screen, names, score, linesX, game_mode):
         score (int, int): Счёт игроков.
         linesX (int): Количество линий по ОX.
         game_mode (int): Режим игры.
+        status (str, optional): Состояние игры, например
+        "Компьютер думает...".
     """
     k = linesX / 20
-    courier = pygame.font.SysFont('courier', int(25 * k))
-    text_score_1 = courier.render(f"{names[0]}: {score[0]}", 0, WHITE)
-    text_score_2 = courier.render(f"{names[1]}: {score[1]}", 0, WHITE)
-    text_mode = courier.render(f"Режим: {game_mode}", 0, WHITE)
+    size = int(25 * k)
+    text_score_1 = render_text(size, f"{names[0]}: {score[0]}", WHITE)
+    text_score_2 = render_text(size, f"{names[1]}: {score[1]}", WHITE)
+    text_mode = render_text(size, f"Режим: {game_mode}", WHITE)
     screen.blit(text_score_1, (20, 50))
     screen.blit(text_score_2, (50 + int(300 * k), 50))
     screen.blit(text_mode, (20, 10))
+    if status:
+        text_status = render_text(size, status, WHITE)
+        screen.blit(text_status, (50 + int(300 * k), 10))
 
 
 def draw_env(
@@ -131,19 +170,19 @@ def draw_env(
         turn (int): Чей ход.
         dots (list((int, int))): Список активных точек.
         occupied_dots (list((int, int))): Список захваченных точек.
-        polygons (list(tuple, list((int, int)))): Список многоугольников
-        Цвет и массив точек.
+        polygons (list(Cover)): Список многоугольников
+        с цветом и точками.
         score (int, int): Счёт игроков.
         names (str, str): Имена игроков.
     """
     draw_window(screen, size)
     draw_text(screen, names, score, linesX, game_mode)
 
-    for polygon, color in polygons:
-        if color == 0:
-            draw_polygon(screen, LIGHT_BLUE, polygon)
+    for cover in polygons:
+        if cover.color == 0:
+            draw_polygon(screen, LIGHT_BLUE, cover.points())
         else:
-            draw_polygon(screen, LIGHT_RED, polygon)
+            draw_polygon(screen, LIGHT_RED, cover.points())
 
     for x in range(linesX):
         draw_vertical_line(screen, BLACK, x, linesY)
@@ -170,3 +209,172 @@ def draw_env(
         draw_dot(screen, BLUE, dot)
     for dot in occupied_red_dots:
         draw_dot(screen, RED, dot)
+
+
+class Renderer:
+    """
+    Рисует игру слоями и обновляет только изменившиеся части окна.
+    Фон с верхним меню и сетка рисуются один раз.
+    Многоугольники и точки рисуются на постоянный слой
+    только когда меняется поле. Точка под курсором
+    рисуется поверх слоя в каждом кадре, где она сдвинулась.
+    """
+
+    def __init__(self, size: tuple, linesX: int, linesY: int):
+        """
+        Args:
+            size (int, int): Размер окна.
+            linesX (int): Количество точек по ОХ.
+            linesY (int): Количество точек по ОY.
+        """
+        self.size = size
+        self.linesX = linesX
+        self.linesY = linesY
+        #  Фон с верхним меню.
+        self.base = pygame.Surface(size)
+        draw_window(self.base, size)
+        #  Сетка на прозрачном фоне: рисуется поверх многоугольников.
+        self.grid = pygame.Surface(size)
+        self.grid.fill(WHITE)
+        self.grid.set_colorkey(WHITE)
+        for x in range(linesX):
+            draw_vertical_line(self.grid, BLACK, x, linesY)
+        for y in range(linesY):
+            draw_horizontal_line(self.grid, BLACK, y, linesX)
+        #  Слой с многоугольниками, точками и текстом.
+        self.layer = pygame.Surface(size)
+        #  Хеш поля, для которого нарисован слой.
+        self.key = None
+        #  Нарисованные точки каждого цвета.
+        #  None - слой ещё ни разу не рисовался.
+        self.drawn = None
+        self.polygons = []
+        self.header = None
+        #  Точка под курсором и её цвет в прошлом кадре.
+        self.hover = None
+
+    def dot_rect(self, pos: tuple):
+        """
+        Возвращает прямоугольник окна, который занимает точка.
+        """
+        xc = properties.GAP + pos[0] * properties.BLOCK_SIZE
+        yc = (properties.UP_LENGTH + properties.GAP +
+              pos[1] * properties.BLOCK_SIZE)
+        return pygame.Rect(xc - 5, yc - 5, 11, 11)
+
+    def rebuild(self, dots: tuple, polygons: list):
+        """
+        Перерисовывает слой целиком.
+
+        Args:
+            dots (set((int, int)), set((int, int))): Точки каждого цвета.
+            polygons (list(Cover)): Многоугольники.
+        """
+        self.layer.blit(self.base, (0, 0))
+        for cover in polygons:
+            if cover.color == 0:
+                draw_polygon(self.layer, LIGHT_BLUE, cover.points())
+            else:
+                draw_polygon(self.layer, LIGHT_RED, cover.points())
+        self.layer.blit(self.grid, (0, 0))
+        for dot in dots[0]:
+            draw_dot(self.layer, BLUE, dot)
+        for dot in dots[1]:
+            draw_dot(self.layer, RED, dot)
+        self.header = None
+
+    def update_layer(self, game):
+        """
+        Переносит на слой изменения поля.
+        Если добавились только точки, то дорисовываются они,
+        иначе слой перерисовывается целиком.
+
+        Args:
+            game (GameState): Состояние игры.
+
+        Returns:
+            list(pygame.Rect): Изменившиеся части окна.
+        """
+        dots = tuple(set(active) | set(occupied) for active, occupied in
+                     zip(game.dots, game.occupied_dots))
+        polygons = list(game.polygons)
+        if (self.drawn is not None and polygons == self.polygons and
+                dots[0] >= self.drawn[0] and dots[1] >= self.drawn[1]):
+            dirty = []
+            for color, player in ((BLUE, 0), (RED, 1)):
+                for dot in dots[player] - self.drawn[player]:
+                    draw_dot(self.layer, color, dot)
+                    dirty.append(self.dot_rect(dot))
+        else:
+            self.rebuild(dots, polygons)
+            dirty = [pygame.Rect(0, 0, *self.size)]
+        self.drawn = dots
+        self.polygons = polygons
+        return dirty
+
+    def update_header(
+            self, names: tuple, score: tuple, game_mode: str,
+            status: str = ""):
+        """
+        Перерисовывает текст в верхнем меню, если он изменился.
+
+        Returns:
+            list(pygame.Rect): Изменившиеся части окна.
+        """
+        header = (tuple(names), tuple(score), game_mode, status)
+        if header == self.header:
+            return []
+        self.header = header
+        rect = pygame.Rect(0, 0, self.size[0], properties.UP_LENGTH)
+        self.layer.blit(self.base, rect, rect)
+        draw_text(self.layer, names, score, self.linesX, game_mode, status)
+        return [rect]
+
+    def draw(
+            self, screen, pos: tuple, game, names: tuple,
+            status: str = ""):
+        """
+        Рисует кадр и возвращает изменившиеся части окна.
+        Если ничего не изменилось, то ничего не рисуется.
+
+        Args:
+            screen: Окно.
+            pos ((int, int)): Точка курсора.
+            game (GameState): Состояние игры.
+            names (str, str): Имена игроков.
+            status (str, optional): Состояние игры для верхнего меню.
+
+        Returns:
+            list(pygame.Rect): Части окна для pygame.display.update.
+        """
+        dirty = []
+        if game.board.hash != self.key:
+            self.key = game.board.hash
+            dirty.extend(self.update_layer(game))
+        dirty.extend(self.update_header(
+            names, game.score, game.game_mode, status))
+
+        hover = None
+        if pos is not None:
+            if game.game_mode == "SB":
+                hover = (pos, LIGHT_GRAY)
+            elif game.turn == 0:
+                hover = (pos, LIGHT_BLUE)
+            else:
+                hover = (pos, LIGHT_RED)
+        if hover != self.hover:
+            if self.hover is not None:
+                dirty.append(self.dot_rect(self.hover[0]))
+            if hover is not None:
+                dirty.append(self.dot_rect(hover[0]))
+        if not dirty:
+            return dirty
+
+        for rect in dirty:
+            screen.blit(self.layer, rect, rect)
+        #  Точка под курсором могла быть стёрта вместе с соседями.
+        if hover is not None:
+            draw_dot(screen, hover[1], hover[0])
+            dirty.append(self.dot_rect(hover[0]))
+        self.hover = hover
+        return dirty
@@ -0,0 +1,317 @@
+import struct
+import properties
+from engine import GameState, BLUE_PLAYER
+
+
+#  Запись партии:
+#  HEADER, с флагом HAS_SETTINGS - SETTINGS, имена игроков
+#  (длина varint и UTF-8), число ходов и длина ходов в байтах
+#  (varint), затем сами ходы.
+#  Записи можно писать в один файл друг за другом.
+#  Заголовок: метка формата, версия, размер поля, режим игры,
+#  флаги и уровень компьютера.
+HEADER = struct.Struct("!2sBBBBBB")
+MAGIC = b"DT"
+VERSION = 2
+#  Версии, которые умеет читать read_record.
+#  В версии 1 не было настроек компьютера.
+VERSIONS = (1, 2)
+#  Режимы игры в порядке их кодов.
+MODES = ("PVP", "PVC", "SB", "ONLINE")
+#  Флаг: компьютер ходит первым.
+COMPUTER_FIRST = 1
+#  Флаг: после заголовка записаны настройки компьютера.
+HAS_SETTINGS = 2
+#  Настройки компьютера: время на ход, приоритеты защиты
+#  и атаки, глубина перебора и размер зоны поиска ходов.
+SETTINGS = struct.Struct("!dddHH")
+#  Имена настроек в SETTINGS - аргументы Computer.
+SETTING_NAMES = ("think_time", "defence_priority", "attack_priority",
+                 "depth", "check_area")
+
+
+def write_varint(out: bytearray, value: int):
+    """
+    Дописывает неотрицательное число по 7 бит в байте,
+    начиная с младших. Старший бит - будет ли ещё байт.
+    """
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, pos: int):
+    """
+    Читает число, записанное write_varint.
+
+    Args:
+        data (bytes): Данные.
+        pos (int): Где начинается число.
+
+    Returns:
+        (int, int): Число и позиция после него.
+
+    Raises:
+        ValueError: Данные оборвались посреди числа.
+    """
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Запись партии оборвана")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def pack_moves(moves: list, linesY: int):
+    """
+    Упаковывает ходы партии.
+    Ход хранится как разность индекса точки с прошлым ходом:
+    соседние ходы обычно рядом, и ход занимает 1-2 байта.
+    Младший бит - сходил ли не тот, чья очередь,
+    что бывает только в песочнице.
+
+    Args:
+        moves (list((int, (int, int)))): Пары (игрок, точка).
+        linesY (int): Количество точек по ОУ.
+
+    Returns:
+        bytes: Упакованные ходы.
+    """
+    out = bytearray()
+    last = 0
+    expected = BLUE_PLAYER
+    for player, (x, y) in moves:
+        idx = x * linesY + y
+        step = idx - last
+        #  Знак переносится в младший бит: 0, -1, 1, -2, ...
+        step = step * 2 if step >= 0 else -step * 2 - 1
+        write_varint(out, step * 2 + (player != expected))
+        last = idx
+        expected = (player + 1) % 2
+    return bytes(out)
+
+
+class Record:
+    """
+    Записанная партия. Ходы хранятся упакованными
+    и распаковываются по одному при проигрывании.
+    """
+
+    def __init__(
+            self, linesX: int, linesY: int, game_mode: str,
+            names: tuple, count: int, data: bytes,
+            is_computer_first: bool = False, level: int = 0,
+            settings: dict = None):
+        """
+        Args:
+            linesX (int): Количество точек по ОХ.
+            linesY (int): Количество точек по ОУ.
+            game_mode (str): Режим игры.
+            names ((str, str)): Имена игроков.
+            count (int): Количество ходов.
+            data (bytes): Ходы, упакованные pack_moves.
+            is_computer_first (bool): Компьютер ходит первым.
+            level (int): Уровень компьютера в режиме PVC.
+            settings (dict, optional): Настройки компьютера -
+            аргументы Computer с именами из SETTING_NAMES.
+        """
+        self.linesX = linesX
+        self.linesY = linesY
+        self.game_mode = game_mode
+        self.names = names
+        self.count = count
+        self.data = data
+        self.is_computer_first = is_computer_first
+        self.level = level
+        self.settings = settings
+
+    def moves(self):
+        """
+        Распаковывает ходы по одному.
+
+        Yields:
+            (int, (int, int)): Игрок и точка.
+        """
+        data = self.data
+        linesY = self.linesY
+        pos = 0
+        last = 0
+        expected = BLUE_PLAYER
+        for _ in range(self.count):
+            value, pos = read_varint(data, pos)
+            player = (expected + 1) % 2 if value & 1 else expected
+            step = value >> 1
+            step = -(step + 1) // 2 if step & 1 else step // 2
+            last += step
+            yield player, divmod(last, linesY)
+            expected = (player + 1) % 2
+
+    def to_bytes(self):
+        """
+        Упаковывает запись целиком.
+
+        Returns:
+            bytes: Запись партии.
+        """
+        flags = COMPUTER_FIRST if self.is_computer_first else 0
+        if self.settings is not None:
+            flags |= HAS_SETTINGS
+        out = bytearray(HEADER.pack(
+            MAGIC, VERSION, self.linesX, self.linesY,
+            MODES.index(self.game_mode), flags, self.level))
+        if self.settings is not None:
+            out += SETTINGS.pack(
+                *(self.settings[name] for name in SETTING_NAMES))
+        for name in self.names:
+            name = name.encode()
+            write_varint(out, len(name))
+            out += name
+        write_varint(out, self.count)
+        write_varint(out, len(self.data))
+        out += self.data
+        return bytes(out)
+
+
+def record_of(game):
+    """
+    Записывает партию.
+
+    Args:
+        game (GameState): Игра, обычно Game.
+
+    Returns:
+        Record: Запись партии.
+    """
+    computer = getattr(game, "computer", None)
+    names = getattr(game, "names", ("Синие", "Красные"))
+    return Record(
+        game.linesX, game.linesY, game.game_mode, tuple(names),
+        len(game.moves), pack_moves(game.moves, game.linesY),
+        getattr(game, "is_computer_first", False),
+        computer.robot_mode if computer is not None else 0,
+        computer.settings() if computer is not None else None)
+
+
+def read_number(f):
+    """
+    Читает из файла число, записанное write_varint.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = read_bytes(f, 1)[0]
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value
+        shift += 7
+
+
+def read_bytes(f, size: int):
+    """
+    Читает из файла ровно size байт.
+    """
+    data = f.read(size)
+    if len(data) < size:
+        raise ValueError("Запись партии оборвана")
+    return data
+
+
+def read_record(f):
+    """
+    Читает следующую запись из открытого двоичного файла.
+
+    Args:
+        f: Файл, открытый на чтение в режиме "rb".
+
+    Returns:
+        Record: Запись или None, если файл закончился.
+
+    Raises:
+        ValueError: Файл не является записью партии или оборван.
+    """
+    head = f.read(HEADER.size)
+    if not head:
+        return None
+    if len(head) < HEADER.size:
+        raise ValueError("Запись партии оборвана")
+    magic, version, x, y, mode, flags, level = HEADER.unpack(head)
+    if magic != MAGIC or version not in VERSIONS or mode >= len(MODES):
+        raise ValueError("Это не запись партии")
+    settings = None
+    if flags & HAS_SETTINGS:
+        settings = dict(zip(
+            SETTING_NAMES, SETTINGS.unpack(read_bytes(f, SETTINGS.size))))
+    names = tuple(read_bytes(f, read_number(f)).decode() for _ in range(2))
+    count = read_number(f)
+    data = read_bytes(f, read_number(f))
+    return Record(x, y, MODES[mode], names, count, data,
+                  bool(flags & COMPUTER_FIRST), level, settings)
+
+
+def read_records(f):
+    """
+    Читает записи из файла по одной, не загружая его целиком.
+
+    Yields:
+        Record: Запись партии.
+    """
+    while True:
+        record = read_record(f)
+        if record is None:
+            return
+        yield record
+
+
+def replay(record: Record, backend: str = properties.CAPTURE_BACKEND):
+    """
+    Проигрывает запись без окна и истории ходов.
+
+    Args:
+        record (Record): Запись партии.
+        backend (str): Способ поиска окружений.
+
+    Returns:
+        GameState: Состояние после последнего хода.
+    """
+    state = GameState(
+        record.linesX, record.linesY, record.game_mode, backend)
+    for player, pos in record.moves():
+        state.make_move(pos, player)
+    return state
+
+
+def save(game, path: str):
+    """
+    Сохраняет партию в файл, заменяя его.
+    """
+    with open(path, "wb") as f:
+        f.write(record_of(game).to_bytes())
+
+
+def load(path: str):
+    """
+    Читает первую запись из файла.
+
+    Returns:
+        Record: Запись партии или None, если файл пуст.
+    """
+    with open(path, "rb") as f:
+        return read_record(f)
+
+
+def restore(record: Record, game):
+    """
+    Переносит записанную партию в игру, чтобы её можно было
+    продолжить. История undo начинается с восстановленной позиции.
+
+    Args:
+        record (Record): Запись партии.
+        game (GameState): Новая игра того же размера, обычно Game.
+    """
+    game.replay(record.moves())
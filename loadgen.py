@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import protocol
+from engine import GameState
+
+
+class Stats:
+    """
+    Задержки доставки ходов от одного игрока другому.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.rejected = 0
+        self.desyncs = 0
+        self.games = 0
+
+    def summary(self, elapsed: float):
+        """
+        Возвращает сводку по задержкам в миллисекундах.
+        """
+        ordered = sorted(self.latencies)
+        result = {
+            "games": self.games,
+            "moves": len(ordered),
+            "rejected": self.rejected,
+            "desyncs": self.desyncs,
+            "elapsed_s": elapsed,
+            "moves_per_s": len(ordered) / elapsed if elapsed else 0.0,
+        }
+        if ordered:
+            result.update({
+                "latency_median_ms": statistics.median(ordered) * 1000,
+                "latency_p95_ms":
+                    ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+                "latency_max_ms": ordered[-1] * 1000,
+            })
+        return result
+
+
+async def idle(host: str, port: int, stop: asyncio.Event):
+    """
+    Держит подключение без единого сообщения.
+    """
+    _, writer = await asyncio.open_connection(host, port)
+    await stop.wait()
+    writer.close()
+
+
+async def player(
+        host: str, port: int, room: str, size: tuple,
+        moves: int, rnd: random.Random, sent: dict,
+        done: asyncio.Barrier, stats: Stats):
+    """
+    Играет одну сторону партии случайными ходами.
+
+    Args:
+        room (str): Название комнаты.
+        size ((int, int)): Размер поля.
+        moves (int): Сколько ходов сделать.
+        rnd (random.Random): Генератор ходов.
+        sent (dict): Время отправки ходов партии,
+        общее для обоих игроков.
+        done (asyncio.Barrier): Оба игрока закончили партию.
+        stats (Stats): Куда записывать задержки.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(protocol.encode(
+        protocol.JOIN, protocol.pack_join(size, "load", room)))
+    kind, payload = await protocol.read_message(reader)
+    if kind != protocol.START:
+        writer.close()
+        await done.wait()
+        return
+    size, color, _ = protocol.unpack_start(payload)
+    #  Копия партии, чтобы выбирать свободные точки.
+    state = GameState(*size, game_mode="ONLINE")
+    free = [(x, y) for x in range(size[0]) for y in range(size[1])]
+    rnd.shuffle(free)
+    made = 0
+    while made < moves and not state.is_over():
+        if state.turn == color:
+            pos = free.pop()
+            while not state.is_free(pos):
+                pos = free.pop()
+            sent[state.board.index(pos)] = time.perf_counter()
+            state.put_dot(pos)
+            writer.write(protocol.encode(protocol.MOVE, protocol.pack_move(
+                pos, state.board.turn_hash(state.turn))))
+            await writer.drain()
+            made += 1
+            continue
+        try:
+            kind, payload = await protocol.read_message(reader)
+        except asyncio.IncompleteReadError:
+            break
+        if kind == protocol.MOVE:
+            pos, hash_value = protocol.unpack_move(payload)
+            stats.latencies.append(
+                time.perf_counter() - sent.pop(state.board.index(pos)))
+            state.put_dot(pos)
+            if hash_value != state.board.turn_hash(state.turn):
+                stats.desyncs += 1
+        elif kind == protocol.REJECT:
+            stats.rejected += 1
+        elif kind == protocol.QUIT:
+            break
+    if color == 0:
+        stats.games += 1
+    #  Выход раньше соперника оборвал бы его партию.
+    await done.wait()
+    writer.write(protocol.encode(protocol.QUIT))
+    writer.close()
+
+
+async def server_stats(host: str, port: int):
+    """
+    Запрашивает счётчики сервера.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(protocol.encode(protocol.STATS))
+    _, payload = await protocol.read_message(reader)
+    writer.close()
+    return json.loads(payload)
+
+
+async def run(args):
+    """
+    Открывает ожидающие подключения и играет партии.
+
+    Returns:
+        dict: Сводка по задержкам и счётчики сервера.
+    """
+    stop = asyncio.Event()
+    idlers = []
+    for _ in range(args.idle):
+        idlers.append(asyncio.create_task(idle(args.host, args.port, stop)))
+    await asyncio.sleep(0)
+
+    stats = Stats()
+    rnd = random.Random(args.seed)
+    size = (args.size, args.size)
+    games = []
+    start = time.perf_counter()
+    for game in range(args.games):
+        room = f"load-{args.seed}-{game}"
+        sent = {}
+        done = asyncio.Barrier(2)
+        for _ in range(2):
+            games.append(player(
+                args.host, args.port, room, size, args.moves,
+                random.Random(rnd.random()), sent, done, stats))
+    await asyncio.gather(*games)
+    elapsed = time.perf_counter() - start
+
+    server = await server_stats(args.host, args.port)
+    stop.set()
+    await asyncio.gather(*idlers, return_exceptions=True)
+    del server["per_room"]
+    return {"client": stats.summary(elapsed), "server": server}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Нагрузка на сервер с локальной машины.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument(
+        "--idle", type=int, default=0,
+        help="сколько подключений просто держать открытыми")
+    parser.add_argument(
+        "--games", type=int, default=10,
+        help="сколько партий играть одновременно")
+    parser.add_argument(
+        "--moves", type=int, default=50,
+        help="сколько ходов делает каждый игрок")
+    parser.add_argument("--size", type=int, default=39)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
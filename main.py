@@ -1,9 +1,13 @@
 import pygame
 import pygame_menu
 import sys
-import os
 from game import Game
 from computer import Computer
+from game_drawer import get_font
+from records import Records
+import game_record
+import properties
+import protocol
 import socket
 
 
@@ -26,7 +30,7 @@ def ask_text(ask: str, max_len: int = 10):
         str: Ответ.
     """
     screen = pygame.display.set_mode([600, 75], depth=12, vsync=1)
-    courier = pygame.font.SysFont('courier', 25)
+    courier = get_font(25)
     clock = pygame.time.Clock()
 
     result = ""
@@ -75,18 +79,34 @@ def ask_binary(ask: str, text1: str, text2: str):
         0 - 1 вариант
         1 - 2 вариант
     """
-    screen = pygame.display.set_mode((500, 100), depth=12, vsync=1)
-    courier = pygame.font.SysFont('courier', 25)
-    clock = pygame.time.Clock()
+    return ask_choice(ask, text1, text2)
 
-    box1 = pygame.Rect(20, 40, 140, 32)
-    box2 = pygame.Rect(170, 40, 140, 32)
 
-    color1 = WHITE
-    color2 = WHITE
+def ask_choice(ask: str, *texts: str):
+    """
+    Выбор между несколькими вариантами.
 
-    active1 = False
-    active2 = False
+    Args:
+        ask (str): Вопрос.
+        texts (str): Варианты.
+
+    Returns:
+        int: Номер выбранного варианта. По умолчанию - 0.
+    """
+    courier = get_font(25)
+    clock = pygame.time.Clock()
+
+    #  Рамки вариантов по ширине текста, но не уже 140.
+    boxes = []
+    x = 20
+    for text in texts:
+        width = max(140, courier.size(text)[0] + 10)
+        boxes.append(pygame.Rect(x, 40, width, 32))
+        x += width + 10
+    screen = pygame.display.set_mode(
+        (max(500, x + 10), 100), depth=12, vsync=1)
+
+    active = None
 
     while True:
         for event in pygame.event.get():
@@ -94,30 +114,23 @@ def ask_binary(ask: str, text1: str, text2: str):
                 pygame.quit()
                 sys.exit()
             if event.type == pygame.MOUSEBUTTONDOWN:
-                if box1.collidepoint(event.pos):
-                    active1 = not active1
-                    active2 = False
-                elif box2.collidepoint(event.pos):
-                    active2 = not active2
-                    active1 = False
-                else:
-                    active1 = False
-                    active2 = False
-                color1 = GREEN if active1 else WHITE
-                color2 = GREEN if active2 else WHITE
+                clicked = None
+                for i, box in enumerate(boxes):
+                    if box.collidepoint(event.pos):
+                        clicked = i
+                active = None if clicked == active else clicked
             if event.type == pygame.KEYDOWN:
-                return 1 if active2 else 0
+                return 0 if active is None else active
 
         screen.fill((30, 30, 30))
 
         dask = courier.render(ask, True, WHITE)
-        dtext1 = courier.render(text1, True, color1)
-        dtext2 = courier.render(text2, True, color2)
         screen.blit(dask, (10, 5))
-        screen.blit(dtext1, (25, 45))
-        screen.blit(dtext2, (175, 45))
-        pygame.draw.rect(screen, color1, box1, 2)
-        pygame.draw.rect(screen, color2, box2, 2)
+        for i, (text, box) in enumerate(zip(texts, boxes)):
+            color = GREEN if i == active else WHITE
+            dtext = courier.render(text, True, color)
+            screen.blit(dtext, (box.x + 5, 45))
+            pygame.draw.rect(screen, color, box, 2)
 
         pygame.display.flip()
         clock.tick(60)
@@ -128,7 +141,7 @@ def ask_size():
     Запрашивает размер поля.
     """
     screen = pygame.display.set_mode((500, 100), depth=12, vsync=1)
-    courier = pygame.font.SysFont('courier', 25)
+    courier = get_font(25)
     clock = pygame.time.Clock()
 
     box1 = pygame.Rect(20, 40, 40, 32)
@@ -216,6 +229,18 @@ def start_game_in_pvp_mode(x: int, y: int):
         linesX=x, linesY=y,
         game_mode="PVP",
         names=(blue_player_name, red_player_name))
+    play_pvp(game)
+
+
+def play_pvp(game: Game):
+    """
+    Играет партию PVP и записывает победителя в таблицу рекордов.
+
+    Args:
+        game (Game): Новая или загруженная игра.
+    """
+    x, y = game.linesX, game.linesY
+    blue_player_name, red_player_name = game.names
 
     score = game.start()
 
@@ -246,10 +271,19 @@ def start_game_in_pvc_mode(x: int, y: int):
     if not player_name:
         player_name = "Игрок"
 
-    level = ask_binary("Выберите уровень компьютера", "Глупый", "Умный")
+    level = ask_choice(
+        "Выберите уровень компьютера",
+        "Глупый", "Умный", "Монте-Карло", "Перебор")
+    think_time = properties.THINK_TIME
+    if level >= 2:
+        answer = ask_text("Время на ход в секундах:", 5)
+        try:
+            think_time = max(float(answer.replace(",", ".")), 0.01)
+        except ValueError:
+            pass
     is_computer_first = ask_binary("Кто ходит первым?", "Игрок", "Компьютер")
 
-    computer = Computer(level)
+    computer = Computer(level, think_time=think_time)
     names = (player_name, "Computer")
     if is_computer_first:
         names = names[::-1]
@@ -258,8 +292,24 @@ def start_game_in_pvc_mode(x: int, y: int):
         game_mode="PVC",
         computer=computer, is_computer_first=is_computer_first,
         names=names)
+    play_pvc(game, computer, player_name)
+
+
+def play_pvc(game: Game, computer: Computer, player_name: str):
+    """
+    Играет партию PVC и записывает игрока в таблицу рекордов,
+    если он победил.
+
+    Args:
+        game (Game): Новая или загруженная игра.
+        computer (Computer): Компьютер.
+        player_name (str): Имя игрока.
+    """
+    x, y = game.linesX, game.linesY
+    is_computer_first = game.is_computer_first
     computer.load_game(game)
     score = game.start()
+    computer.close()
 
     if is_computer_first:
         if score[RED_PLAYER] > score[BLUE_PLAYER]:
@@ -292,71 +342,186 @@ def start_game_in_sandbox_mode(x: int, y: int):
     show_result(score, "Синие", "Красные")
 
 
-def start_game_in_online_mode():
+def continue_saved_game():
     """
-    Запускает игру в SANDBOX.
+    Продолжает партию, сохранённую клавишей s.
+    """
+    try:
+        record = game_record.load(properties.SAVE_FILE)
+    except (OSError, ValueError):
+        record = None
+    if record is None:
+        show_text("Нет сохранённой партии")
+        pygame.time.wait(2000)
+        build_menu()
+        return
+
+    computer = None
+    if record.game_mode == "PVC":
+        computer = Computer(record.level, **(record.settings or {}))
+    game = Game(
+        linesX=record.linesX, linesY=record.linesY,
+        game_mode=record.game_mode,
+        computer=computer, is_computer_first=record.is_computer_first,
+        names=record.names)
+    game_record.restore(record, game)
+    match record.game_mode:
+        case "PVP":
+            play_pvp(game)
+        case "PVC":
+            player_name = record.names[int(record.is_computer_first)]
+            play_pvc(game, computer, player_name)
+        case "SB":
+            show_result(game.start(), *record.names)
+    build_menu()
+
+
+def wait_for(text: str, ready):
+    """
+    Показывает текст, пока не выполнится условие.
+    Окно всё это время отвечает на события.
 
     Args:
-        x (int): Количество точек по ОХ.
-        y (int): Количество точек по ОУ.
+        text (str): Текст.
+        ready: Функция без аргументов. Возвращает результат
+        или None, если ждать нужно дальше.
+
+    Returns:
+        Результат ready.
+    """
+    show_text(text)
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        result = ready()
+        if result is not None:
+            return result
+        pygame.time.wait(properties.NETWORK_POLL)
+
+
+def accept(sock: socket.socket):
     """
-    type = ask_binary("Выберите свою роль",
+    Принимает подключение, если оно есть.
+
+    Returns:
+        socket.socket: Сокет игрока или None.
+    """
+    try:
+        return sock.accept()[0]
+    except BlockingIOError:
+        return None
+
+
+def start_game_in_online_mode():
+    """
+    Запускает игру по сети.
+    """
+    type = ask_choice("Выберите свою роль",
                       "Хост",
-                      "Игрок")
-    if type == 0:
+                      "Игрок",
+                      "Сервер")
+    if type == 2:
+        start_game_on_server()
+    elif type == 0:
         ip = socket.gethostbyname(socket.gethostname())
         sock = socket.socket()
         sock.bind((ip, 0))
         ip, port = sock.getsockname()
-        show_text(f"ip: {ip} port: {port}")
         sock.listen(1)
-        sc, addr = sock.accept()
+        sock.setblocking(False)
+        sc = wait_for(f"ip: {ip} port: {port}", lambda: accept(sock))
+        sock.close()
+        connection = protocol.Connection(sc)
 
         name_host = ask_text("Введите имя")
-        sc.send(bytes(name_host.encode()))
-        show_text("Ждите ответа игрока")
-        name_player = str(sc.recv(1024).decode())
+        connection.send(protocol.NAME, name_host.encode())
+        name_player = wait_for(
+            "Ждите ответа игрока",
+            lambda: connection.receive(protocol.NAME)).decode()
 
         turn = ask_binary("Кто ходит первым?",
                           "Хост",
                           "Игрок")
-        sc.send(bytes(str(turn).encode()))
+        connection.send(protocol.TURN, bytes([turn]))
 
         x, y = ask_size()
-        sc.send(bytes(str(x).encode()))
-        sc.send(bytes(str(y).encode()))
+        connection.send(protocol.SIZE, protocol.pack_point((x, y)))
 
         game = Game(
             linesX=x, linesY=y,
             game_mode="ONLINE",
             names=(name_host, name_player))
-        score = game.start(sc, turn)
+        score = game.start(connection, turn, authority=True)
+        connection.close()
         show_result(score, name_host, name_player)
     else:
         sc = socket.socket()
         ip = ask_text("Введите ip хоста", 15)
         port = int(ask_text("Введите port хоста", 5))
         sc.connect((ip, port))
+        connection = protocol.Connection(sc)
 
-        show_text("Ждите ответа хоста")
-        name_host = str(sc.recv(1024).decode())
+        name_host = wait_for(
+            "Ждите ответа хоста",
+            lambda: connection.receive(protocol.NAME)).decode()
         name_player = ask_text("Введите имя")
-        sc.send(bytes(name_player.encode()))
-
-        show_text("Ждите ответа хоста")
-        turn = int(str(sc.recv(1024).decode()))
+        connection.send(protocol.NAME, name_player.encode())
 
-        x = int(str(sc.recv(1024).decode()))
-        y = int(str(sc.recv(1024).decode()))
+        turn = wait_for(
+            "Ждите ответа хоста",
+            lambda: connection.receive(protocol.TURN))[0]
+        x, y = protocol.unpack_point(wait_for(
+            "Ждите ответа хоста",
+            lambda: connection.receive(protocol.SIZE)))
 
         game = Game(
             linesX=x, linesY=y,
             game_mode="ONLINE",
             names=(name_player, name_host))
-        score = game.start(sc, (turn + 1) % 2)
+        score = game.start(connection, (turn + 1) % 2)
+        connection.close()
         show_result(score, name_player, name_host)
 
 
+def start_game_on_server():
+    """
+    Запускает игру через сервер с комнатами.
+    """
+    ip = ask_text("Введите ip сервера", 15)
+    port = int(ask_text("Введите port сервера", 5))
+    name = ask_text("Введите имя")
+    room = ask_text("Комната (Enter - любая)")
+    x, y = ask_size()
+    connection = protocol.Connection(socket.create_connection((ip, port)))
+    connection.send(protocol.JOIN, protocol.pack_join((x, y), name, room))
+
+    def started():
+        reason = connection.receive(protocol.REJECT)
+        if reason is not None:
+            return reason.decode()
+        return connection.receive(protocol.START)
+
+    answer = wait_for("Ждите соперника", started)
+    if isinstance(answer, str):
+        connection.close()
+        show_text(answer)
+        pygame.time.wait(2000)
+        return
+    (x, y), color, opponent = protocol.unpack_start(answer)
+    #  Имена в порядке цветов: первыми ходят синие.
+    names = (name, opponent) if color == 0 else (opponent, name)
+
+    game = Game(
+        linesX=x, linesY=y,
+        game_mode="ONLINE",
+        names=names)
+    score = game.start(connection, color)
+    connection.close()
+    show_result(score, *names)
+
+
 def start_game(game_mode):
     match game_mode:
         case "PVP":
@@ -369,7 +534,11 @@ def start_game(game_mode):
             x, y = ask_size()
             start_game_in_sandbox_mode(x, y)
         case "ONLINE":
-            start_game_in_online_mode()
+            try:
+                start_game_in_online_mode()
+            except OSError:
+                show_text("Соединение разорвано")
+                pygame.time.wait(2000)
 
     build_menu()
 
@@ -384,7 +553,7 @@ def show_text(text: str):
         name_2 (str): Имя 2 игрока.
     """
     screen = pygame.display.set_mode([500, 40], depth=12, vsync=1)
-    courier = pygame.font.SysFont('courier', 25)
+    courier = get_font(25)
     text_1 = courier.render(text, 0, WHITE)
     screen.blit(text_1, (10, 10))
     pygame.display.flip()
@@ -407,7 +576,7 @@ def show_result(score: tuple, name_1: str, name_2: str):
                 sys.exit()
             if event.type == pygame.KEYDOWN:
                 return
-        courier = pygame.font.SysFont('courier', 25)
+        courier = get_font(25)
         text = f"{name_1}: {score[0]}"
         text_score_1 = courier.render(text, 0, WHITE)
         text = f"{name_2}: {score[1]}"
@@ -425,31 +594,14 @@ def write_record(name: str, score: int, x: int, y: int):
     Записывает результат в таблицу рекордов.
 
     Args:
-        name (str): _description_
-        score (int): _description_
-        x (int): _description_
-        y (int): _description_
-    """
-    if not os.path.exists("records.txt"):
-        with open("records.txt", "w", encoding='utf-8') as f:
-            a = f"{name} {score} {x} {y}"
-            f.write(a)
-            f.write("\n")
-    else:
-        records = []
-        with open("records.txt", "r", encoding='utf-8') as f:
-            table = f.readlines()
-        for r in table:
-            rr = r.split(" ")[-3:]
-            if len(rr) < 3:
-                continue
-            val = 1000 / (int(rr[0]) * int(rr[1]) * int(rr[2]))
-            records.append((val, r))
-        records.append((1000 / (score * x * y), f"{name} {score} {x} {y}"))
-        with open("records.txt", "w", encoding='utf-8') as f:
-            for record in sorted(records):
-                f.write(record[1])
-                f.write("\n")
+        name (str): Имя игрока.
+        score (int): Очки.
+        x (int): Количество точек по ОХ.
+        y (int): Количество точек по ОУ.
+    """
+    table = Records()
+    table.add(name, score, x, y)
+    table.close()
 
 
 def show_records():
@@ -457,20 +609,14 @@ def show_records():
     Выводит таблицу рекордов.
     """
     screen = pygame.display.set_mode([1000, 310], depth=12, vsync=1)
-    courier = pygame.font.SysFont('courier', 25)
+    courier = get_font(25)
     texts = []
-    if os.path.exists("records.txt"):
-        with open("records.txt", "r", encoding='utf-8') as f:
-            table = f.readlines()
-        for r in table:
-            r = r.split(" ")
-            if len(r) < 4:
-                continue
-            name = ' '.join(r[:-3])
-            size = f"{r[-2]} на {r[-1][:-1]}"
-            text = f"{name} набрал {r[-3]} очков на поле размера {size}"
-            text = courier.render(text, 0, WHITE)
-            texts.append(text)
+    table = Records()
+    for name, score, x, y in table.top(properties.RECORDS_SHOWN):
+        text = (f"{name} набрал {score} очков "
+                f"на поле размера {x} на {y}")
+        texts.append(courier.render(text, 0, WHITE))
+    table.close()
     if len(texts) == 0:
         text = "Нет записей"
         text = courier.render(text, 0, WHITE)
@@ -500,6 +646,7 @@ def start():
     menu.add.button('Online', lambda: start_game("ONLINE"))
     menu.add.button('Таблица рекордов', show_records)
     menu.add.button('Песочница', lambda: start_game("SB"))
+    menu.add.button('Продолжить', continue_saved_game)
     menu.add.button('Выход', pygame_menu.events.EXIT)
     menu.set_title("Точки")
     menu.mainloop(screen)
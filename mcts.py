@@ -0,0 +1,356 @@
+import math
+import random
+import time
+import properties
+from board import EMPTY, OWNER, CAPTURED
+
+
+#  Таблица для bytes.translate: оставляет от клетки только владельца.
+OWNERS = bytes(value & OWNER for value in range(256))
+
+
+class RolloutBoard:
+    """
+    Лёгкая копия поля для случайной партии.
+    Точки пишутся прямо в копию клеток: без журнала, хеша,
+    кандидатов и истории, а после партии копия выбрасывается.
+    Окружения ищутся так же, как в GameState.check, но только
+    захват и освобождение точек со счётом: зоны не блокируются
+    и многоугольники не строятся, потому что ходов дальше нет.
+    """
+    __slots__ = ("cells", "sides", "around", "edge", "score", "pending")
+
+    def __init__(self, state):
+        """
+        Args:
+            state (GameState): Состояние игры.
+        """
+        board = state.board
+        self.cells = bytearray(board.cells)
+        self.sides = board.sides
+        self.around = board.around
+        self.edge = board.edge
+        self.score = list(state.score)
+        #  Клетки для следующих проверок, как GameState.pending.
+        self.pending = [set(state.pending[0]), set(state.pending[1])]
+
+    def put(self, idx: int, player: int):
+        """
+        Ставит точку игрока и возвращает свободных соседей клетки
+        по восьми направлениям.
+        """
+        cells = self.cells
+        cells[idx] = player + 1
+        self.pending[0].add(idx)
+        self.pending[1].add(idx)
+        return [neigh for neigh in self.around[idx] if cells[neigh] == EMPTY]
+
+    def check(self, current: int):
+        """
+        Захватывает точки противника в окружённых текущим игроком
+        зонах и освобождает в них свои точки.
+
+        Args:
+            current (int): Текущий игрок.
+        """
+        cells = self.cells
+        sides = self.sides
+        around = self.around
+        edge = self.edge
+        dot = current + 1
+        enemy = (current + 1) % 2
+
+        starts = []
+        for idx in self.pending[current]:
+            if cells[idx] & (OWNER | CAPTURED) != dot:
+                starts.append(idx)
+            #  Стена окружения идёт через точку к двум соседним
+            #  по восьми направлениям, одиночная точка ничего
+            #  не замыкает.
+            elif sum(cells[neigh] & (OWNER | CAPTURED) == dot
+                     for neigh in around[idx]) >= 2:
+                starts.extend(sides[idx])
+        self.pending[current] = set()
+
+        open_cells = set()
+        seen = set()
+        for start in starts:
+            if (start in seen or start in open_cells or
+                    cells[start] & (OWNER | CAPTURED) == dot):
+                continue
+            #  Тот же обход, что в GameState.fill.
+            component = {start}
+            stack = [start]
+            while stack:
+                cell = stack.pop()
+                if edge[cell] or cell in open_cells:
+                    open_cells.update(component)
+                    component = None
+                    break
+                for neigh in sides[cell]:
+                    if (neigh not in component and
+                            cells[neigh] & (OWNER | CAPTURED) != dot):
+                        component.add(neigh)
+                        stack.append(neigh)
+            if component is None:
+                continue
+            seen.update(component)
+            for idx in component:
+                value = cells[idx] & (OWNER | CAPTURED)
+                if value == enemy + 1:
+                    cells[idx] |= CAPTURED
+                    self.score[current] += 1
+                    self.pending[enemy].add(idx)
+                elif value == dot | CAPTURED:
+                    cells[idx] &= ~CAPTURED
+                    self.score[enemy] -= 1
+                    self.pending[current].add(idx)
+                    self.pending[enemy].add(idx)
+
+
+class Node:
+    """
+    Узел дерева поиска.
+    """
+    __slots__ = (
+        "move", "player", "parent", "children", "untried",
+        "visits", "wins")
+
+    def __init__(self, move: int, player: int, parent=None):
+        """
+        Args:
+            move (int): Ход, ведущий в узел. None для корня.
+            player (int): Кто сделал этот ход.
+            parent (Node, optional): Родительский узел.
+        """
+        self.move = move
+        self.player = player
+        self.parent = parent
+        #  Дети по индексу клетки хода.
+        self.children = {}
+        #  Ещё не рассмотренные ходы.
+        #  Заполняются при первом посещении узла.
+        self.untried = None
+        #  Количество проигрываний через узел.
+        self.visits = 0
+        #  Сумма результатов для игрока player.
+        self.wins = 0.0
+
+    def select(self, exploration: float):
+        """
+        Выбирает ребёнка по формуле UCT.
+
+        Args:
+            exploration (float): Коэфицент исследования.
+
+        Returns:
+            Node: Выбранный ребёнок.
+        """
+        log = math.log(self.visits)
+        return max(
+            self.children.values(),
+            key=lambda node: (node.wins / node.visits +
+                              exploration * math.sqrt(log / node.visits)))
+
+
+class MCTS:
+    """
+    Поиск по дереву методом Монте-Карло с ограничением по времени.
+    Дерево сохраняется между ходами: после ответа игрока
+    поиск продолжается с соответствующего поддерева.
+    """
+
+    def __init__(
+            self, budget: float = properties.THINK_TIME,
+            rollout_depth: int = properties.ROLLOUT_DEPTH,
+            exploration: float = 1.4,
+            stop=None,
+            check_area: int = properties.CHECK_AREA):
+        """
+        Args:
+            budget (float): Время на ход в секундах.
+            rollout_depth (int): Длина случайной партии.
+            exploration (float): Коэфицент исследования в UCT.
+            stop (threading.Event, optional): Флаг досрочной остановки.
+            check_area (int): Размер зоны, в которой ищутся ходы.
+        """
+        self.budget = budget
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.stop = stop
+        self.check_area = check_area
+        #  Корень сохранённого дерева и владельцы клеток в нём.
+        self.root = None
+        self.owners = None
+        #  Число проигрываний за последний поиск.
+        self.playouts = 0
+
+    def candidates(self, state, last: int):
+        """
+        Возвращает ходы для стороны, чья очередь ходить:
+        свободные клетки рядом с точками противника,
+        ближайшие к последнему ходу.
+
+        Args:
+            state (GameState): Состояние игры.
+            last (int): Индекс клетки последнего хода.
+
+        Returns:
+            list(int): Индексы клеток в случайном порядке.
+        """
+        board = state.board
+        player = (state.turn + 1) % 2
+        if last is None:
+            moves = board.candidates(player)
+        else:
+            moves = board.candidates_near(
+                player, last, self.check_area)
+        random.shuffle(moves)
+        return moves
+
+    def reuse(self, state, player_pos: tuple):
+        """
+        Находит в сохранённом дереве узел для текущего состояния.
+        Дерево переиспользуется, только если с прошлого поиска
+        был сделан ровно один ход - ход игрока.
+
+        Args:
+            state (GameState): Состояние игры.
+            player_pos ((int, int)): Последний ход игрока.
+
+        Returns:
+            Node: Корень для нового поиска.
+        """
+        board = state.board
+        last = None if player_pos is None else board.index(player_pos)
+        player = (state.turn + 1) % 2
+        root = None
+        if self.root is not None and last is not None:
+            owners = board.cells.translate(OWNERS)
+            changed = [idx for idx, (a, b) in
+                       enumerate(zip(self.owners, owners)) if a != b]
+            if changed == [last] and owners[last] == player + 1:
+                root = self.root.children.get(last)
+        if root is None:
+            root = Node(last, player)
+        root.parent = None
+        return root
+
+    def search(self, game, player_pos: tuple):
+        """
+        Выбирает ход для стороны, чья очередь ходить.
+
+        Args:
+            game (GameState): Состояние игры.
+            player_pos ((int, int)): Последний ход игрока.
+
+        Returns:
+            (int, int): Пара (X, Y) или None, если ходить некуда.
+        """
+        state = game.copy()
+        root = self.reuse(state, player_pos)
+        deadline = time.perf_counter() + self.budget
+        self.playouts = 0
+        while True:
+            self.playout(state, root)
+            self.playouts += 1
+            if root.untried == [] and not root.children:
+                return None
+            if time.perf_counter() >= deadline:
+                break
+            if self.stop is not None and self.stop.is_set():
+                break
+
+        best = max(root.children.values(), key=lambda node: node.visits)
+        #  Запоминает поддерево выбранного хода до следующего поиска.
+        owners = bytearray(state.board.cells.translate(OWNERS))
+        owners[best.move] = state.turn + 1
+        self.root = best
+        self.owners = bytes(owners)
+        return state.board.pos(best.move)
+
+    def rollout(self, state, last: int):
+        """
+        Случайная партия из rollout_depth ходов. Ходы выбираются
+        рядом с последними поставленными точками.
+        Партия играется на RolloutBoard, а не на самом состоянии:
+        точки просто ставятся в копию клеток, а окружения
+        проверяются один раз в конце партии.
+
+        Args:
+            state (GameState): Состояние игры.
+            last (int): Индекс клетки последнего хода.
+
+        Returns:
+            (int, int): Счёт игроков в конце партии.
+        """
+        board = RolloutBoard(state)
+        cells = board.cells
+        turn = state.turn
+        moves = []
+        if last is not None:
+            moves = [neigh for neigh in board.around[last]
+                     if cells[neigh] == EMPTY]
+        for _ in range(self.rollout_depth):
+            move = None
+            while moves:
+                i = random.randrange(len(moves))
+                moves[i], moves[-1] = moves[-1], moves[i]
+                move = moves.pop()
+                if cells[move] == EMPTY:
+                    break
+                move = None
+            if move is None:
+                break
+            moves.extend(board.put(move, turn))
+            turn = (turn + 1) % 2
+
+        board.check(turn)
+        board.check((turn + 1) % 2)
+        return tuple(board.score)
+
+    def playout(self, state, root: Node):
+        """
+        Одно проигрывание: спуск по дереву, добавление узла,
+        случайная партия и обновление статистики.
+        Состояние после проигрывания возвращается к исходному.
+
+        Args:
+            state (GameState): Состояние игры в корне.
+            root (Node): Корень дерева.
+        """
+        board = state.board
+        start = tuple(state.score)
+        deltas = []
+        node = root
+
+        #  Спуск по полностью раскрытым узлам.
+        while node.untried == [] and node.children:
+            node = node.select(self.exploration)
+            deltas.append(state.make_move(board.pos(node.move)))
+
+        #  Добавление нового узла.
+        if node.untried is None:
+            node.untried = self.candidates(state, node.move)
+        if node.untried:
+            move = node.untried.pop()
+            child = Node(move, state.turn, node)
+            node.children[move] = child
+            deltas.append(state.make_move(board.pos(move)))
+            node = child
+
+        score = self.rollout(state, node.move)
+        gain = (score[0] - start[0], score[1] - start[1])
+        for delta in reversed(deltas):
+            state.unmake_move(delta)
+
+        #  Обновление статистики: 1 - выигрыш, 0.5 - ничья, 0 - проигрыш
+        #  для игрока, сделавшего ход в узел.
+        while node is not None:
+            node.visits += 1
+            diff = gain[node.player] - gain[(node.player + 1) % 2]
+            if diff > 0:
+                node.wins += 1
+            elif diff == 0:
+                node.wins += 0.5
+            node = node.parent
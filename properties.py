@@ -2,7 +2,23 @@ BLOCK_SIZE = 25
 GAP = 50
 
 UP_LENGTH = 100
+TEXT_CACHE_SIZE = 64
+EVENT_TIMEOUT = 500
+NETWORK_POLL = 10
 
 DEFENCE_PRIORITY = 0.9
 ATTACK_PRIORITY = 1
 CHECK_AREA = 5
+COMPUTER_WORKERS = 0
+THINK_TIME = 1.0
+ROLLOUT_DEPTH = 10
+SEARCH_DEPTH = 4
+SEARCH_WIDTH = 8
+TABLE_SIZE = 100000
+
+HISTORY_SIZE = 1000
+CAPTURE_BACKEND = "python"
+
+RECORDS_FILE = "records.db"
+RECORDS_SHOWN = 9
+SAVE_FILE = "save.dots"
@@ -0,0 +1,387 @@
+import selectors
+import socket
+import struct
+from collections import deque
+
+
+#  Заголовок сообщения: длина данных и тип сообщения.
+HEADER = struct.Struct("!HB")
+#  Пара координат точки.
+POINT = struct.Struct("!BB")
+#  Ход в списке ходов: игрок и координаты.
+RECORD = struct.Struct("!BBB")
+#  Хеш состояния.
+HASH = struct.Struct("!Q")
+#  Номер хода в партии.
+INDEX = struct.Struct("!H")
+
+#  Типы сообщений.
+#  Ход: координаты точки и хеш состояния после хода.
+MOVE = 1
+#  Имя игрока в UTF-8.
+NAME = 2
+#  Размер поля.
+SIZE = 3
+#  Кто ходит первым: 0 - хост, 1 - игрок.
+TURN = 4
+#  Выход из игры.
+QUIT = 5
+#  Ходы партии, начиная с указанного, для восстановления состояния.
+RESYNC = 6
+#  Сообщения сервера с комнатами.
+#  Вход в комнату: размер поля, имя игрока и название комнаты.
+#  Пустое название - в любую комнату с тем же размером поля.
+JOIN = 7
+#  Начало партии: размер поля, свой цвет и имя соперника.
+START = 8
+#  Ход отклонён сервером, данные - причина в UTF-8.
+REJECT = 9
+#  Запрос счётчиков сервера, ответ - JSON в UTF-8.
+STATS = 10
+#  Состояния разошлись: просьба прислать ходы,
+#  начиная с последнего совпавшего состояния.
+DESYNC = 11
+
+#  Заголовок входа в комнату и начала партии.
+JOIN_HEADER = struct.Struct("!BBB")
+
+#  Сколько байт читать из сокета за раз.
+CHUNK = 65536
+
+
+def encode(kind: int, payload: bytes = b""):
+    """
+    Упаковывает сообщение в кадр: длина, тип и данные.
+
+    Args:
+        kind (int): Тип сообщения.
+        payload (bytes): Данные.
+
+    Returns:
+        bytes: Кадр.
+    """
+    return HEADER.pack(len(payload), kind) + payload
+
+
+def pack_point(pos: tuple):
+    """
+    Упаковывает координаты точки или размер поля.
+    """
+    return POINT.pack(*pos)
+
+
+def unpack_point(payload: bytes):
+    """
+    Распаковывает координаты точки или размер поля.
+    """
+    return POINT.unpack(payload)
+
+
+def pack_move(pos: tuple, hash_value: int = None):
+    """
+    Упаковывает ход и, если он есть, хеш состояния после него.
+    """
+    if hash_value is None:
+        return POINT.pack(*pos)
+    return POINT.pack(*pos) + HASH.pack(hash_value)
+
+
+def unpack_move(payload: bytes):
+    """
+    Распаковывает ход.
+
+    Returns:
+        ((int, int), int): Точка и хеш состояния или None.
+    """
+    pos = POINT.unpack_from(payload)
+    if len(payload) < POINT.size + HASH.size:
+        return pos, None
+    return pos, HASH.unpack_from(payload, POINT.size)[0]
+
+
+def pack_index(index: int):
+    """
+    Упаковывает номер хода.
+    """
+    return INDEX.pack(index)
+
+
+def unpack_index(payload: bytes):
+    """
+    Распаковывает номер хода.
+    """
+    return INDEX.unpack(payload)[0]
+
+
+def pack_resync(start: int, moves: list):
+    """
+    Упаковывает ходы партии, начиная с хода start.
+
+    Args:
+        start (int): Номер первого хода.
+        moves (list((int, (int, int)))): Пары (игрок, точка).
+
+    Returns:
+        bytes: Данные сообщения.
+    """
+    return INDEX.pack(start) + pack_moves(moves)
+
+
+def unpack_resync(payload: bytes):
+    """
+    Распаковывает ходы партии.
+
+    Returns:
+        (int, list((int, (int, int)))): Номер первого хода и ходы.
+    """
+    return INDEX.unpack_from(payload)[0], unpack_moves(payload[INDEX.size:])
+
+
+def pack_moves(moves: list):
+    """
+    Упаковывает ходы партии.
+
+    Args:
+        moves (list((int, (int, int)))): Пары (игрок, точка).
+
+    Returns:
+        bytes: Данные сообщения.
+    """
+    return b"".join(RECORD.pack(player, x, y) for player, (x, y) in moves)
+
+
+def unpack_moves(payload: bytes):
+    """
+    Распаковывает ходы партии.
+
+    Returns:
+        list((int, (int, int))): Пары (игрок, точка).
+    """
+    return [(player, (x, y))
+            for player, x, y in RECORD.iter_unpack(payload)]
+
+
+def pack_join(size: tuple, name: str, room: str = ""):
+    """
+    Упаковывает вход в комнату.
+
+    Args:
+        size ((int, int)): Размер поля, если комната создаётся.
+        name (str): Имя игрока.
+        room (str): Название комнаты.
+
+    Returns:
+        bytes: Данные сообщения.
+    """
+    name = name.encode()
+    return JOIN_HEADER.pack(*size, len(name)) + name + room.encode()
+
+
+def unpack_join(payload: bytes):
+    """
+    Распаковывает вход в комнату.
+
+    Returns:
+        ((int, int), str, str): Размер поля, имя игрока и комнаты.
+    """
+    x, y, length = JOIN_HEADER.unpack_from(payload)
+    name = payload[JOIN_HEADER.size:JOIN_HEADER.size + length]
+    room = payload[JOIN_HEADER.size + length:]
+    return (x, y), name.decode(), room.decode()
+
+
+def pack_start(size: tuple, color: int, name: str):
+    """
+    Упаковывает начало партии.
+
+    Args:
+        size ((int, int)): Размер поля.
+        color (int): Цвет игрока: 0 - синие, ходят первыми.
+        name (str): Имя соперника.
+
+    Returns:
+        bytes: Данные сообщения.
+    """
+    return JOIN_HEADER.pack(*size, color) + name.encode()
+
+
+def unpack_start(payload: bytes):
+    """
+    Распаковывает начало партии.
+
+    Returns:
+        ((int, int), int, str): Размер поля, цвет и имя соперника.
+    """
+    x, y, color = JOIN_HEADER.unpack_from(payload)
+    return (x, y), color, payload[JOIN_HEADER.size:].decode()
+
+
+async def read_message(reader):
+    """
+    Читает одно сообщение из asyncio.StreamReader.
+
+    Returns:
+        (int, bytes): Тип и данные сообщения.
+
+    Raises:
+        asyncio.IncompleteReadError: Соединение закрыто.
+    """
+    length, kind = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return kind, await reader.readexactly(length)
+
+
+class Decoder:
+    """
+    Собирает кадры из потока байт.
+    TCP может склеивать и разрезать отправленные данные,
+    поэтому байты копятся, пока не придёт кадр целиком.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes):
+        """
+        Добавляет прочитанные байты.
+
+        Args:
+            data (bytes): Байты из сокета.
+
+        Returns:
+            list((int, bytes)): Пришедшие целиком сообщения.
+        """
+        self.buffer += data
+        messages = []
+        start = 0
+        while len(self.buffer) - start >= HEADER.size:
+            length, kind = HEADER.unpack_from(self.buffer, start)
+            end = start + HEADER.size + length
+            if end > len(self.buffer):
+                break
+            messages.append(
+                (kind, bytes(self.buffer[start + HEADER.size:end])))
+            start = end
+        del self.buffer[:start]
+        return messages
+
+
+class Connection:
+    """
+    Неблокирующее соединение с другим игроком.
+    Ни один метод не ждёт сеть: отправка копится в буфере
+    и досылается при следующих вызовах, а чтение возвращает
+    только то, что уже пришло.
+    """
+
+    def __init__(self, sock: socket.socket):
+        """
+        Args:
+            sock (socket.socket): Подключённый сокет.
+        """
+        sock.setblocking(False)
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            #  Ходы короткие, их не нужно копить перед отправкой.
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(sock, selectors.EVENT_READ)
+        self.decoder = Decoder()
+        #  Пришедшие, но ещё не забранные сообщения.
+        self.inbox = deque()
+        #  Ещё не отправленные байты.
+        self.outbox = bytearray()
+        #  Соединение закрыто другой стороной.
+        self.closed = False
+
+    def send(self, kind: int, payload: bytes = b""):
+        """
+        Отправляет сообщение.
+
+        Args:
+            kind (int): Тип сообщения.
+            payload (bytes): Данные.
+        """
+        self.outbox += encode(kind, payload)
+        self.flush()
+
+    def flush(self):
+        """
+        Досылает накопленные байты, сколько примет сокет.
+        """
+        if self.closed or not self.outbox:
+            return
+        try:
+            sent = self.sock.send(self.outbox)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.closed = True
+            return
+        del self.outbox[:sent]
+
+    def poll(self, timeout: float = 0):
+        """
+        Забирает все пришедшие сообщения.
+
+        Args:
+            timeout (float): Сколько секунд ждать данных. 0 - не ждать.
+
+        Returns:
+            list((int, bytes)): Пары (тип, данные).
+        """
+        self.flush()
+        if not self.closed and self.selector.select(timeout):
+            while True:
+                try:
+                    data = self.sock.recv(CHUNK)
+                except BlockingIOError:
+                    break
+                except OSError:
+                    data = b""
+                if not data:
+                    self.closed = True
+                    break
+                self.inbox.extend(self.decoder.feed(data))
+        messages = list(self.inbox)
+        self.inbox.clear()
+        return messages
+
+    def receive(self, kind: int):
+        """
+        Забирает первое пришедшее сообщение нужного типа.
+        Остальные сообщения остаются в очереди.
+
+        Args:
+            kind (int): Тип сообщения.
+
+        Returns:
+            bytes: Данные сообщения или None, если оно ещё не пришло.
+
+        Raises:
+            ConnectionError: Соединение закрыто, а сообщения нет.
+        """
+        messages = self.poll()
+        result = None
+        for message in messages:
+            if result is None and message[0] == kind:
+                result = message[1]
+            else:
+                self.inbox.append(message)
+        if result is None and self.closed:
+            raise ConnectionError("Соединение закрыто")
+        return result
+
+    def close(self):
+        """
+        Досылает накопленные байты и закрывает соединение.
+        """
+        if not self.closed and self.outbox:
+            self.sock.setblocking(True)
+            self.sock.settimeout(1)
+            try:
+                self.sock.sendall(self.outbox)
+            except OSError:
+                pass
+        self.selector.close()
+        self.sock.close()
+        self.closed = True
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import properties
+
+
+#  Таблица рекордов и индексы под выборки лучших результатов:
+#  всех, на поле заданного размера и одного игрока.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_value ON records (value);
+CREATE INDEX IF NOT EXISTS records_size ON records (x, y, value);
+CREATE INDEX IF NOT EXISTS records_name ON records (name, value);
+"""
+
+
+def rating(score: int, x: int, y: int):
+    """
+    Возвращает оценку результата. Чем она меньше, тем выше
+    результат в таблице: очки важнее на маленьком поле.
+    """
+    return 1000 / (score * x * y)
+
+
+class Records:
+    """
+    Таблица рекордов в SQLite.
+    Запись и выборка лучших результатов идут по индексам и не
+    читают всю таблицу. Несколько процессов игры могут писать
+    одновременно: SQLite сам ставит их записи в очередь.
+    """
+
+    def __init__(self, path: str = properties.RECORDS_FILE,
+                 legacy: str = "records.txt"):
+        """
+        Args:
+            path (str): Файл базы.
+            legacy (str): Текстовая таблица старого формата.
+            Её записи один раз переносятся в пустую базу.
+        """
+        #  Писатель ждёт, пока другой процесс закончит запись.
+        self.db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        #  С журналом WAL чтение не ждёт записи.
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.load_legacy(legacy)
+
+    def load_legacy(self, legacy: str):
+        """
+        Переносит записи из текстовой таблицы, если база пуста.
+        Строка таблицы: имя, очки, размер поля по ОХ и по ОУ.
+        """
+        if not os.path.exists(legacy):
+            return
+        #  Проверка и перенос в одной транзакции,
+        #  чтобы два процесса не перенесли записи дважды.
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            if self.db.execute("SELECT 1 FROM records LIMIT 1").fetchone():
+                return
+            with open(legacy, "r", encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 4:
+                        continue
+                    try:
+                        score, x, y = map(int, parts[-3:])
+                    except ValueError:
+                        continue
+                    if score * x * y == 0:
+                        continue
+                    self.add(' '.join(parts[:-3]), score, x, y)
+        finally:
+            self.db.execute("COMMIT")
+
+    def add(self, name: str, score: int, x: int, y: int):
+        """
+        Записывает результат.
+
+        Args:
+            name (str): Имя игрока.
+            score (int): Очки.
+            x (int): Количество точек по ОХ.
+            y (int): Количество точек по ОУ.
+        """
+        self.db.execute(
+            "INSERT INTO records (name, score, x, y, value) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (name, score, x, y, rating(score, x, y)))
+
+    def top(self, count: int, size: tuple = None, name: str = None):
+        """
+        Возвращает лучшие результаты.
+
+        Args:
+            count (int): Сколько результатов вернуть.
+            size ((int, int), optional): Только на поле этого размера.
+            name (str, optional): Только этого игрока.
+
+        Returns:
+            list((str, int, int, int)): Имя, очки и размер поля.
+        """
+        query = "SELECT name, score, x, y FROM records"
+        conditions = []
+        args = []
+        if size is not None:
+            conditions.append("x = ? AND y = ?")
+            args += size
+        if name is not None:
+            conditions.append("name = ?")
+            args.append(name)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY value, id LIMIT ?"
+        args.append(count)
+        return self.db.execute(query, args).fetchall()
+
+    def close(self):
+        """
+        Закрывает базу.
+        """
+        self.db.close()
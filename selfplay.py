@@ -0,0 +1,344 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import game_record
+from cli import parse_size
+from computer import Computer
+from engine import GameState
+
+
+#  Уровни компьютера по названиям.
+LEVELS = {"random": 0, "smart": 1, "mcts": 2, "alphabeta": 3}
+#  Настройки компьютера в описании игрока и аргументы Computer.
+OPTIONS = {
+    "defence": ("defence_priority", float),
+    "attack": ("attack_priority", float),
+    "area": ("check_area", int),
+    "time": ("think_time", float),
+    "depth": ("depth", int),
+}
+#  Квантиль нормального распределения для 95% интервала.
+Z95 = 1.96
+
+
+def parse_player(spec: str):
+    """
+    Разбирает описание игрока: уровень и, через двоеточие,
+    настройки, например smart:defence=1.2,attack=1,area=3.
+
+    Args:
+        spec (str): Описание игрока.
+
+    Returns:
+        (int, dict): Уровень компьютера и аргументы Computer.
+
+    Raises:
+        ValueError: Неизвестный уровень или настройка.
+    """
+    name, _, rest = spec.partition(":")
+    if name not in LEVELS:
+        raise ValueError(f"Неизвестный уровень: {name}")
+    kwargs = {}
+    for option in filter(None, rest.split(",")):
+        key, _, value = option.partition("=")
+        if key not in OPTIONS:
+            raise ValueError(f"Неизвестная настройка: {key}")
+        arg, kind = OPTIONS[key]
+        kwargs[arg] = kind(value)
+    return LEVELS[name], kwargs
+
+
+def play_game(task: tuple):
+    """
+    Играет одну партию компьютеров без окна.
+    Функция на уровне модуля, чтобы её можно было
+    запускать в пуле процессов.
+
+    Args:
+        task (tuple): Номер партии, описания синего и красного
+        игроков, размер поля, зерно и нужна ли запись партии.
+
+    Returns:
+        dict: Результат партии.
+    """
+    game_id, blue, red, (linesX, linesY), seed, keep = task
+    random.seed(seed)
+    state = GameState(linesX, linesY, "PVP")
+    computers = []
+    for spec in (blue, red):
+        level, kwargs = parse_player(spec)
+        computer = Computer(level, workers=0, **kwargs)
+        computer.load_game(state)
+        computers.append(computer)
+
+    start = time.process_time()
+    moves = []
+    #  Первый ход в центр, как у компьютера в игре.
+    pos = (linesX // 2, linesY // 2)
+    while True:
+        moves.append((state.turn, pos))
+        state.make_move(pos)
+        if state.is_over():
+            break
+        pos = computers[state.turn].move(pos)
+        if pos is None or not state.is_free(pos):
+            #  Компьютеру некуда ходить рядом: случайная точка.
+            board = state.board
+            free = [idx for idx, cell in enumerate(board.cells)
+                    if cell == 0]
+            pos = board.pos(random.choice(free))
+
+    result = {
+        "game": game_id,
+        "blue": blue,
+        "red": red,
+        "score": list(state.score),
+        "moves": len(moves),
+        "cpu_s": time.process_time() - start,
+        #  Попадания в оценки умного компьютера для подбора настроек.
+        "hit_rate": [computer.evaluations.stats()["hit_rate"]
+                     for computer in computers],
+    }
+    if keep:
+        result["record"] = game_record.Record(
+            linesX, linesY, "PVP", (blue, red), len(moves),
+            game_record.pack_moves(moves, linesY)).to_bytes().hex()
+    return result
+
+
+def points(result: dict):
+    """
+    Возвращает очки синих в партии: 1 - победа, 0.5 - ничья.
+    """
+    blue, red = result["score"]
+    return 1.0 if blue > red else 0.5 if blue == red else 0.0
+
+
+def elo(share: float):
+    """
+    Переводит долю набранных очков в разницу рейтингов Эло.
+    При доле 0 или 1 разница бесконечна, и возвращается None.
+    """
+    if share <= 0 or share >= 1:
+        return None
+    return -400 * math.log10(1 / share - 1)
+
+
+def pair_summary(scores: list):
+    """
+    Доля очков первого игрока против второго и разница Эло
+    с 95% интервалами Уилсона. Они не вырождаются,
+    даже если один игрок выиграл все партии.
+
+    Args:
+        scores (list(float)): Очки первого игрока в каждой партии.
+
+    Returns:
+        dict: Сводка по паре.
+    """
+    count = len(scores)
+    share = sum(scores) / count
+    spread = Z95 * Z95 / count
+    center = (share + spread / 2) / (1 + spread)
+    margin = Z95 * math.sqrt(
+        share * (1 - share) / count + spread / count / 4) / (1 + spread)
+    low, high = center - margin, center + margin
+    return {
+        "games": count,
+        "wins": scores.count(1.0),
+        "draws": scores.count(0.5),
+        "losses": scores.count(0.0),
+        "score": share,
+        "score_ci": [low, high],
+        "elo_diff": elo(share),
+        "elo_diff_ci": [elo(low), elo(high)],
+    }
+
+
+def fit_ratings(players: list, games: list, iterations: int = 200):
+    """
+    Подбирает рейтинги Эло по всем партиям сразу
+    (модель Брэдли - Терри, ничья - половина победы).
+    Рейтинг первого игрока равен 0.
+
+    Args:
+        players (list(str)): Игроки.
+        games (list((int, int, float))): Номера синего и красного
+        игроков и очки синих.
+        iterations (int): Количество итераций.
+
+    Returns:
+        list(float): Рейтинги игроков.
+    """
+    count = len(players)
+    #  Одна воображаемая ничья в каждой паре, чтобы у игрока
+    #  без побед рейтинг не уходил в минус бесконечность.
+    wins = [0.0] * count
+    played = [[0] * count for _ in range(count)]
+    for i, j in itertools.combinations(range(count), 2):
+        played[i][j] = played[j][i] = 1
+        wins[i] += 0.5
+        wins[j] += 0.5
+    for blue, red, score in games:
+        wins[blue] += score
+        wins[red] += 1 - score
+        played[blue][red] += 1
+        played[red][blue] += 1
+
+    strength = [1.0] * count
+    for _ in range(iterations):
+        for i in range(count):
+            total = sum(played[i][j] / (strength[i] + strength[j])
+                        for j in range(count) if j != i)
+            if total > 0:
+                strength[i] = wins[i] / total
+    return [400 * math.log10(value / strength[0]) for value in strength]
+
+
+def ratings(players: list, results: list, samples: int, seed: int):
+    """
+    Рейтинги Эло игроков с 95% интервалами.
+    Интервалы считаются бутстрепом: партии выбираются
+    с возвращением, и рейтинги подбираются заново.
+
+    Args:
+        players (list(str)): Игроки.
+        results (list(dict)): Результаты партий.
+        samples (int): Количество выборок бутстрепа.
+        seed (int): Зерно выборок.
+
+    Returns:
+        dict: Для каждого игрока рейтинг и интервал.
+    """
+    index = {player: i for i, player in enumerate(players)}
+    games = [(index[result["blue"]], index[result["red"]], points(result))
+             for result in results]
+    rating = fit_ratings(players, games)
+    rnd = random.Random(seed)
+    boot = [fit_ratings(players, rnd.choices(games, k=len(games)), 50)
+            for _ in range(samples)]
+    summary = {}
+    for i, player in enumerate(players):
+        values = sorted(sample[i] for sample in boot)
+        interval = None
+        if values:
+            interval = [values[int(0.025 * (len(values) - 1))],
+                        values[int(0.975 * (len(values) - 1))]]
+        summary[player] = {"elo": rating[i], "elo_ci": interval}
+    return summary
+
+
+def summarize(players: list, results: list, elapsed: float, workers: int,
+              samples: int, seed: int):
+    """
+    Сводка турнира: доли очков по парам, рейтинги и скорость.
+
+    Returns:
+        dict: Сводка.
+    """
+    pairs = {}
+    for first, second in itertools.combinations(players, 2):
+        scores = []
+        for result in results:
+            if (result["blue"], result["red"]) == (first, second):
+                scores.append(points(result))
+            elif (result["blue"], result["red"]) == (second, first):
+                scores.append(1 - points(result))
+        if scores:
+            pairs[f"{first} vs {second}"] = pair_summary(scores)
+    moves = sum(result["moves"] for result in results)
+    cpu = sum(result["cpu_s"] for result in results)
+    return {
+        "games": len(results),
+        "workers": workers,
+        "elapsed_s": elapsed,
+        "games_per_s": len(results) / elapsed,
+        "games_per_s_per_core": len(results) / elapsed / workers,
+        "moves_per_s": moves / elapsed,
+        "cpu_s_per_game": cpu / len(results),
+        "pairs": pairs,
+        "ratings": ratings(players, results, samples, seed),
+    }
+
+
+def run(args):
+    """
+    Играет круговой турнир и пишет результаты партий
+    в файл по мере их окончания, по одной строке JSON.
+
+    Returns:
+        dict: Сводка турнира.
+    """
+    for player in args.players:
+        parse_player(player)
+    tasks = []
+    for first, second in itertools.combinations(args.players, 2):
+        for game in range(args.games):
+            #  Цвета чередуются: синие ходят первыми.
+            blue, red = (first, second) if game % 2 == 0 \
+                else (second, first)
+            tasks.append((len(tasks), blue, red, args.size,
+                          args.seed + len(tasks), args.records))
+
+    #  os.cpu_count() может не знать числа ядер.
+    workers = args.workers or os.cpu_count() or 1
+    results = []
+    start = time.perf_counter()
+    with open(args.output, "w", encoding="utf-8") as output, \
+            ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(play_game, task) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            result.pop("record", None)
+            results.append(result)
+    elapsed = time.perf_counter() - start
+    #  Порядок окончания партий случаен, а сводка должна повторяться.
+    results.sort(key=lambda result: result["game"])
+    return summarize(args.players, results, elapsed, workers,
+                     args.bootstrap, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Турнир компьютеров без окна.")
+    parser.add_argument(
+        "--player", "-p", dest="players", action="append",
+        help="игрок: random, smart, mcts или alphabeta и настройки, "
+             "например smart:defence=1.2,attack=1,area=3")
+    parser.add_argument(
+        "--games", type=int, default=20,
+        help="сколько партий играет каждая пара игроков")
+    parser.add_argument("--size", type=parse_size, default=(15, 15))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="количество процессов, по умолчанию по числу ядер")
+    parser.add_argument(
+        "--output", "-o", default="selfplay.jsonl",
+        help="файл для результатов партий")
+    parser.add_argument(
+        "--records", action="store_true",
+        help="добавлять к результатам запись партии (game_record)")
+    parser.add_argument(
+        "--bootstrap", type=int, default=200,
+        help="сколько выборок для интервалов рейтингов")
+    args = parser.parse_args()
+    if not args.players:
+        args.players = ["random", "smart"]
+    if len(args.players) < 2:
+        parser.error("нужны хотя бы два игрока")
+    #  Результаты и рейтинги собираются по описанию игрока.
+    if len(set(args.players)) < len(args.players):
+        parser.error("игроки не должны повторяться")
+    print(json.dumps(run(args), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
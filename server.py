@@ -0,0 +1,396 @@
+import argparse
+import asyncio
+import itertools
+import json
+import struct
+import time
+import protocol
+from engine import GameState
+from sync import Sync
+
+
+#  Сколько байт может ждать отправки одному игроку.
+#  Кто не читает сообщения, тот отключается, а не копит их
+#  в памяти сервера: отправка сопернику не ждёт сети.
+WRITE_LIMIT = 1 << 20
+
+
+class Counters:
+    """
+    Счётчики сообщений, ходов и задержки их обработки.
+    Задержка - время от получения хода до отправки его сопернику.
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.moves = 0
+        self.rejected = 0
+        self.resyncs = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def add_latency(self, seconds: float):
+        """
+        Учитывает обработку одного хода.
+        """
+        self.moves += 1
+        self.latency_total += seconds
+        self.latency_max = max(self.latency_max, seconds)
+
+    def snapshot(self):
+        """
+        Возвращает значения счётчиков и скорости в секунду.
+
+        Returns:
+            dict: Счётчики.
+        """
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        return {
+            "uptime_s": elapsed,
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "moves": self.moves,
+            "rejected": self.rejected,
+            "resyncs": self.resyncs,
+            "moves_per_s": self.moves / elapsed,
+            "messages_per_s":
+                (self.messages_in + self.messages_out) / elapsed,
+            "latency_mean_ms":
+                self.latency_total / self.moves * 1000 if self.moves else 0.0,
+            "latency_max_ms": self.latency_max * 1000,
+        }
+
+
+class Player:
+    """
+    Подключённый игрок.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.name = ""
+        self.room = None
+        #  Цвет в партии: 0 - синие, 1 - красные.
+        self.color = None
+
+
+class Room:
+    """
+    Комната на двух игроков. Партия в ней идёт на сервере:
+    сервер сам применяет ходы и решает, допустимы ли они.
+    """
+
+    def __init__(self, name: str, size: tuple):
+        """
+        Args:
+            name (str): Название комнаты.
+            size ((int, int)): Размер поля.
+        """
+        self.name = name
+        self.size = size
+        self.players = []
+        #  Состояние партии. Создаётся, когда собрались оба игрока.
+        self.state = None
+        #  Ходы партии для восстановления состояния игроков.
+        self.sync = None
+        self.counters = Counters()
+
+    def opponent(self, player: Player):
+        """
+        Возвращает соперника игрока или None.
+        """
+        for other in self.players:
+            if other is not player:
+                return other
+        return None
+
+
+class Server:
+    """
+    Сервер для многих партий сразу.
+    Каждое подключение обслуживается задачей asyncio,
+    поэтому ожидающие игроки почти ничего не стоят.
+    """
+
+    def __init__(self):
+        self.rooms = {}
+        #  Комнаты автоматического подбора, ждущие второго игрока,
+        #  по размеру поля.
+        self.waiting = {}
+        self.counters = Counters()
+        self.connections = 0
+        self.games_started = 0
+        self.games_finished = 0
+        self.ids = itertools.count(1)
+
+    def counters_of(self, player: Player):
+        """
+        Возвращает счётчики, которые затрагивает игрок:
+        общие и его комнаты.
+        """
+        if player.room is None:
+            return [self.counters]
+        return [self.counters, player.room.counters]
+
+    def send(self, player: Player, kind: int, payload: bytes = b""):
+        """
+        Отправляет сообщение игроку, не дожидаясь отправки.
+        Если у игрока скопилось больше WRITE_LIMIT неотправленных
+        байт, то соединение с ним закрывается.
+        """
+        writer = player.writer
+        if writer.is_closing():
+            return
+        frame = protocol.encode(kind, payload)
+        writer.write(frame)
+        for counters in self.counters_of(player):
+            counters.messages_out += 1
+            counters.bytes_out += len(frame)
+        if writer.transport.get_write_buffer_size() > WRITE_LIMIT:
+            writer.close()
+
+    async def handle(self, reader, writer):
+        """
+        Обслуживает одно подключение.
+        """
+        player = Player(writer)
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    kind, payload = await protocol.read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                received = time.perf_counter()
+                for counters in self.counters_of(player):
+                    counters.messages_in += 1
+                    counters.bytes_in += protocol.HEADER.size + len(payload)
+                #  Испорченное сообщение отклоняется,
+                #  а подключение продолжает работать.
+                try:
+                    match kind:
+                        case protocol.JOIN:
+                            self.join(player, *protocol.unpack_join(payload))
+                        case protocol.MOVE:
+                            self.move(player, payload, received)
+                        case protocol.DESYNC:
+                            self.resync(
+                                player, protocol.unpack_index(payload))
+                        case protocol.STATS:
+                            self.send(player, protocol.STATS,
+                                      json.dumps(self.stats()).encode())
+                        case protocol.QUIT:
+                            break
+                except (struct.error, ValueError):
+                    self.reject(player, "Неверное сообщение")
+                await writer.drain()
+        finally:
+            self.leave(player)
+            self.connections -= 1
+            writer.close()
+
+    def join(self, player: Player, size: tuple, name: str, room_name: str):
+        """
+        Сажает игрока в комнату. Если в комнате уже есть
+        соперник, то начинается партия.
+
+        Args:
+            player (Player): Игрок.
+            size ((int, int)): Размер поля для новой комнаты.
+            name (str): Имя игрока.
+            room_name (str): Название комнаты,
+            пустое - автоматический подбор.
+            Названия с # занимает автоматический подбор.
+        """
+        if player.room is not None:
+            self.send(player, protocol.REJECT, "Вы уже в комнате".encode())
+            return
+        if room_name.startswith("#"):
+            self.send(player, protocol.REJECT,
+                      "Название комнаты не может начинаться с #".encode())
+            return
+        if not (1 <= size[0] <= 99 and 1 <= size[1] <= 99):
+            self.send(player, protocol.REJECT, "Неверный размер".encode())
+            return
+        player.name = name
+        if room_name:
+            room = self.rooms.get(room_name)
+            if room is None:
+                room = Room(room_name, size)
+                self.rooms[room_name] = room
+        else:
+            room = self.waiting.pop(size, None)
+            if room is None:
+                room = Room(f"#{next(self.ids)}", size)
+                self.rooms[room.name] = room
+                self.waiting[size] = room
+        if len(room.players) >= 2:
+            self.send(player, protocol.REJECT, "Комната занята".encode())
+            return
+        room.players.append(player)
+        player.room = room
+        if len(room.players) == 2:
+            self.begin(room)
+
+    def begin(self, room: Room):
+        """
+        Начинает партию в комнате.
+        Первым ходит тот, кто вошёл первым.
+        """
+        room.state = GameState(*room.size, game_mode="ONLINE")
+        room.sync = Sync(room.state, authority=True)
+        self.games_started += 1
+        for color, player in enumerate(room.players):
+            player.color = color
+            self.send(player, protocol.START, protocol.pack_start(
+                room.size, color, room.opponent(player).name))
+
+    def move(self, player: Player, payload: bytes, received: float):
+        """
+        Проверяет ход, применяет его и пересылает сопернику.
+
+        Args:
+            player (Player): Кто ходит.
+            payload (bytes): Данные хода.
+            received (float): Когда ход был получен.
+        """
+        room = player.room
+        if room is None or room.state is None:
+            self.reject(player, "Партия не началась")
+            return
+        state = room.state
+        pos, player_hash = protocol.unpack_move(payload)
+        reason = room.sync.validate(pos, player.color)
+        if reason is not None:
+            self.reject(player, reason)
+            return
+
+        #  Сопернику уходит хеш сервера: по нему он сверит состояние.
+        hash_value = room.sync.play(pos)
+        self.send(room.opponent(player), protocol.MOVE,
+                  protocol.pack_move(pos, hash_value))
+        latency = time.perf_counter() - received
+        self.counters.add_latency(latency)
+        room.counters.add_latency(latency)
+        #  Ход принят, но у игрока другое состояние: он попросит ходы.
+        if player_hash is not None and player_hash != hash_value:
+            self.reject(player, "Состояния разошлись")
+        if state.is_over():
+            self.games_finished += 1
+            self.close(room)
+
+    def resync(self, player: Player, start: int):
+        """
+        Присылает игроку ходы партии, начиная с хода start -
+        последнего состояния, совпавшего у игрока с сервером.
+        """
+        room = player.room
+        if room is None or room.sync is None:
+            return
+        for counters in self.counters_of(player):
+            counters.resyncs += 1
+        self.send(player, protocol.RESYNC, protocol.pack_resync(
+            start, room.sync.moves_from(start)))
+
+    def reject(self, player: Player, reason: str):
+        """
+        Сообщает игроку, что его ход не принят.
+        """
+        for counters in self.counters_of(player):
+            counters.rejected += 1
+        self.send(player, protocol.REJECT, reason.encode())
+
+    def leave(self, player: Player):
+        """
+        Убирает игрока из комнаты. Сопернику сообщается о выходе.
+        """
+        room = player.room
+        if room is None:
+            return
+        opponent = room.opponent(player)
+        if opponent is not None and room.state is not None:
+            self.send(opponent, protocol.QUIT)
+        room.players.remove(player)
+        player.room = None
+        if room.state is not None or not room.players:
+            self.close(room)
+
+    def close(self, room: Room):
+        """
+        Закрывает комнату.
+        """
+        self.rooms.pop(room.name, None)
+        if self.waiting.get(room.size) is room:
+            del self.waiting[room.size]
+        for player in room.players:
+            player.room = None
+        room.players = []
+
+    def stats(self):
+        """
+        Возвращает общие счётчики и счётчики каждой комнаты.
+
+        Returns:
+            dict: Счётчики.
+        """
+        return {
+            "connections": self.connections,
+            "rooms": len(self.rooms),
+            "games_started": self.games_started,
+            "games_finished": self.games_finished,
+            "total": self.counters.snapshot(),
+            "per_room": {
+                name: dict(room.counters.snapshot(),
+                           players=len(room.players))
+                for name, room in self.rooms.items()},
+        }
+
+    async def report(self, interval: float):
+        """
+        Раз в interval секунд печатает общие счётчики.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            stats = self.stats()
+            del stats["per_room"]
+            print(json.dumps(stats), flush=True)
+
+
+async def serve(host: str, port: int, interval: float):
+    """
+    Запускает сервер и работает, пока его не остановят.
+    """
+    server = Server()
+    listener = await asyncio.start_server(
+        server.handle, host, port, backlog=4096)
+    for sock in listener.sockets:
+        print("Сервер слушает", sock.getsockname(), flush=True)
+    if interval > 0:
+        asyncio.create_task(server.report(interval))
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Сервер для игры в точки по сети.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument(
+        "--stats-interval", type=float, default=10,
+        help="раз в сколько секунд печатать счётчики, 0 - не печатать")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+class Sync:
+    """
+    Ведёт партию по сети и следит, чтобы состояния сторон совпадали.
+    Каждый ход сопровождается хешем Zobrist состояния после него.
+    Хеш обновляется вместе с полем, поэтому сравнение почти бесплатно.
+    Одна сторона главная: хост или сервер. Если у второй стороны
+    ход не проходит проверку или хеш не совпал, то она откатывается
+    к последнему совпавшему состоянию и заново применяет ходы
+    главной стороны начиная с него.
+    """
+
+    def __init__(self, state, authority: bool):
+        """
+        Args:
+            state (GameState): Состояние игры.
+            authority (bool): Это главная сторона.
+        """
+        self.state = state
+        self.authority = authority
+        #  Все ходы партии: пары (игрок, точка).
+        self.log = []
+        #  Сколько первых ходов совпадает с главной стороной.
+        self.agreed = 0
+        #  Изменения от ходов после совпавшего состояния.
+        #  Главная сторона не откатывается и их не хранит.
+        self.deltas = []
+
+    def hash(self):
+        """
+        Возвращает хеш состояния вместе с тем, чей ход.
+        """
+        return self.state.board.turn_hash(self.state.turn)
+
+    def validate(self, pos: tuple, player: int):
+        """
+        Проверяет, может ли игрок сейчас поставить точку.
+
+        Args:
+            pos ((int, int)): Координаты точки.
+            player (int): Кто ходит.
+
+        Returns:
+            str: Причина, по которой ход невозможен, или None.
+        """
+        state = self.state
+        if state.turn != player:
+            return "Сейчас ход соперника"
+        if not (0 <= pos[0] < state.linesX and 0 <= pos[1] < state.linesY):
+            return "Точка вне поля"
+        if not state.is_free(pos):
+            return "Точка занята"
+        return None
+
+    def play(self, pos: tuple):
+        """
+        Совершает ход того, чья сейчас очередь.
+
+        Args:
+            pos ((int, int)): Координаты точки.
+
+        Returns:
+            int: Хеш состояния после хода.
+        """
+        player = self.state.turn
+        delta = self.state.make_move(pos)
+        self.log.append((player, pos))
+        if not self.authority:
+            self.deltas.append(delta)
+        return self.hash()
+
+    def confirm(self, hash_value: int):
+        """
+        Сравнивает хеш другой стороны со своим.
+        При совпадении все ходы считаются согласованными.
+
+        Args:
+            hash_value (int): Хеш другой стороны.
+
+        Returns:
+            bool: Совпали ли состояния.
+        """
+        if hash_value != self.hash():
+            return False
+        self.agreed = len(self.log)
+        self.deltas = []
+        return True
+
+    def moves_from(self, start: int):
+        """
+        Возвращает ходы, начиная с хода start.
+        """
+        return self.log[start:]
+
+    def resync(self, start: int, moves: list):
+        """
+        Откатывается к ходу start и применяет ходы главной стороны.
+        Обычно откатываются только несогласованные ходы,
+        иначе партия заново проигрывается с пустого поля.
+
+        Args:
+            start (int): Номер первого хода в moves.
+            moves (list((int, (int, int)))): Пары (игрок, точка).
+
+        Raises:
+            ValueError: Ходы не подходят к этой партии. Они
+            проверяются до отката, так что состояние не меняется.
+        """
+        state = self.state
+        if not 0 <= start <= len(self.log):
+            raise ValueError("Ходы не подходят к партии")
+        for player, (x, y) in moves:
+            if player not in (0, 1) or \
+                    not (0 <= x < state.linesX and 0 <= y < state.linesY):
+                raise ValueError("Ход вне поля")
+        first = len(self.log) - len(self.deltas)
+        if first <= start <= len(self.log):
+            while len(self.log) > start:
+                state.unmake_move(self.deltas.pop())
+                self.log.pop()
+        else:
+            self.log = self.log[:start]
+            state.replay(self.log)
+        for player, pos in moves:
+            state.make_move(pos, player)
+            self.log.append((player, pos))
+        self.agreed = len(self.log)
+        self.deltas = []
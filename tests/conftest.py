@@ -0,0 +1,55 @@
+import os
+import sys
+import pytest
+
+
+#  Модули игры лежат в корне репозитория.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+
+def random_move(state, rnd, last):
+    """
+    Выбирает ход для случайной партии.
+    Чаще всего ход делается рядом с последним, чтобы
+    на поле возникали окружения, иначе - в случайную клетку.
+
+    Args:
+        state (GameState): Состояние игры.
+        rnd (random.Random): Генератор с заданным зерном.
+        last ((int, int)): Последний ход или None.
+
+    Returns:
+        (int, int): Пара (X, Y) или None, если ходить некуда.
+    """
+    board = state.board
+    if last is not None and rnd.random() < 0.7:
+        near = board.free_neighbours8(board.index(last))
+        if near:
+            return board.pos(rnd.choice(near))
+    free = [idx for idx, cell in enumerate(board.cells) if cell == 0]
+    if not free:
+        return None
+    return board.pos(rnd.choice(free))
+
+
+@pytest.fixture
+def next_move():
+    """
+    Выбор хода для случайных партий (см. random_move).
+    """
+    return random_move
+
+
+@pytest.fixture
+def random_game():
+    """
+    Ходы случайной партии до конца игры. Ход выбирается
+    по текущему состоянию, так что делать его должен вызывающий.
+    """
+    def moves(state, rnd):
+        last = None
+        while not state.is_over():
+            last = random_move(state, rnd, last)
+            yield last
+    return moves
@@ -0,0 +1,17 @@
+from alphabeta import AlphaBeta
+from engine import GameState
+
+
+def test_table_keeps_positions_with_different_last_move_apart():
+    game = GameState(12, 12)
+    for pos in [(5, 5), (2, 4), (6, 6), (9, 9)]:
+        game.make_move(pos)
+    search = AlphaBeta(depth=2, think_time=30, check_area=1)
+
+    #  Поле то же самое, но ходы ищутся рядом с последним ходом.
+    first = search.search(game, (2, 4))
+    second = search.search(game, (9, 9))
+    fresh = AlphaBeta(depth=2, think_time=30, check_area=1)
+    assert second == fresh.search(game, (9, 9))
+    assert max(abs(first[0] - 2), abs(first[1] - 4)) <= 1
+    assert max(abs(second[0] - 9), abs(second[1] - 9)) <= 1
@@ -0,0 +1,36 @@
+import random
+import pytest
+from engine import GameState
+
+pytest.importorskip("numpy")
+
+
+SIZES = [(1, 1), (1, 7), (7, 1), (2, 2), (2, 9), (9, 2), (3, 3),
+         (8, 8), (12, 10), (15, 15)]
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("seed", range(4))
+def test_numpy_backend_matches_python(size, seed, random_game):
+    rnd = random.Random(seed)
+    game = GameState(*size, backend="python")
+    reference = GameState(*size, backend="numpy")
+    for pos in random_game(game, rnd):
+        game.make_move(pos)
+        reference.make_move(pos)
+        assert bytes(game.board.cells) == bytes(reference.board.cells), pos
+        assert game.score == reference.score
+        assert game.turn == reference.turn
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_numpy_backend_matches_python_in_sandbox(seed, random_game):
+    rnd = random.Random(seed)
+    game = GameState(12, 12, "SB", backend="python")
+    reference = GameState(12, 12, "SB", backend="numpy")
+    for pos in random_game(game, rnd):
+        player = rnd.randrange(2)
+        game.make_move(pos, player)
+        reference.make_move(pos, player)
+        assert bytes(game.board.cells) == bytes(reference.board.cells), pos
+        assert game.score == reference.score
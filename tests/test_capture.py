@@ -0,0 +1,118 @@
+import random
+import pytest
+from board import OWNER, CAPTURED, BLOCKED
+from engine import GameState
+
+
+class Rules:
+    """
+    Правила игры на простом поле из словарей, без кода движка:
+    после хода заливка от рамки по всем клеткам, кроме активных
+    точек игрока, а всё, куда она не дошла, окружено.
+    Сначала окружает тот, кто ходит, потом его соперник.
+    """
+
+    def __init__(self, linesX: int, linesY: int):
+        self.linesX = linesX
+        self.linesY = linesY
+        cells = [(x, y) for x in range(linesX) for y in range(linesY)]
+        #  Владелец точки: 0, 1 или None.
+        self.owner = dict.fromkeys(cells)
+        self.captured = dict.fromkeys(cells, False)
+        self.blocked = dict.fromkeys(cells, False)
+        self.score = [0, 0]
+        self.turn = 0
+        #  Все окружённые зоны, где что-то захвачено.
+        self.zones = []
+
+    def neighbours(self, pos):
+        x, y = pos
+        for near in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if near in self.owner:
+                yield near
+
+    def wall(self, pos, player):
+        return self.owner[pos] == player and not self.captured[pos]
+
+    def enclosed(self, player):
+        """
+        Связные области клеток, не дошедшие до рамки.
+        """
+        outside = {(x, y) for (x, y) in self.owner
+                   if (x in (0, self.linesX - 1) or
+                       y in (0, self.linesY - 1)) and
+                   not self.wall((x, y), player)}
+        stack = list(outside)
+        while stack:
+            for near in self.neighbours(stack.pop()):
+                if near not in outside and not self.wall(near, player):
+                    outside.add(near)
+                    stack.append(near)
+        zones = []
+        seen = set(outside)
+        for pos in self.owner:
+            if pos in seen or self.wall(pos, player):
+                continue
+            zone = {pos}
+            stack = [pos]
+            while stack:
+                for near in self.neighbours(stack.pop()):
+                    if near not in zone and not self.wall(near, player):
+                        zone.add(near)
+                        stack.append(near)
+            seen |= zone
+            zones.append(zone)
+        return zones
+
+    def check(self, player):
+        enemy = 1 - player
+        for zone in self.enclosed(player):
+            took = False
+            for pos in zone:
+                if self.owner[pos] == enemy and not self.captured[pos]:
+                    self.captured[pos] = True
+                    self.score[player] += 1
+                    took = True
+                elif self.owner[pos] == player and self.captured[pos]:
+                    self.captured[pos] = False
+                    self.score[enemy] -= 1
+            if took:
+                for pos in zone:
+                    self.blocked[pos] = True
+                self.zones.append(zone)
+
+    def move(self, pos):
+        self.owner[pos] = self.turn
+        self.check(self.turn)
+        self.check(1 - self.turn)
+        self.turn = 1 - self.turn
+
+    def state(self):
+        cells = {pos: (self.owner[pos], self.captured[pos],
+                       self.blocked[pos]) for pos in self.owner}
+        zones = sorted(sorted(zone) for zone in self.zones)
+        return cells, list(self.score), self.turn, zones
+
+
+def state_of(game):
+    board = game.board
+    cells = {}
+    for idx, cell in enumerate(board.cells):
+        owner = (cell & OWNER) - 1
+        cells[board.pos(idx)] = (None if owner < 0 else owner,
+                                 bool(cell & CAPTURED), bool(cell & BLOCKED))
+    zones = sorted(sorted(board.pos(idx) for idx in cover.component)
+                   for cover in game.polygons)
+    return cells, list(game.score), game.turn, zones
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_check_matches_rules(seed, random_game):
+    rnd = random.Random(seed)
+    size = rnd.choice([(8, 8), (12, 10), (15, 15)])
+    game = GameState(*size)
+    rules = Rules(*size)
+    for pos in random_game(game, rnd):
+        game.make_move(pos)
+        rules.move(pos)
+        assert state_of(game) == rules.state(), pos
@@ -0,0 +1,106 @@
+import random
+import pytest
+from engine import GameState
+
+
+def old_points(board, current: int, component: set):
+    """
+    Точки многоугольника, которые выбирал прежний build_cover:
+    стены зоны, кроме окружённых ею с четырёх сторон
+    и выступов, за которыми нет других стен.
+    """
+    def get_count(idx):
+        dot = None
+        count = 0
+        for neigh in board.neighbours(idx):
+            if neigh in component:
+                count += 1
+            else:
+                dot = neigh
+        return count, dot
+
+    walls = {neigh for idx in component for neigh in board.neighbours(idx)
+             if neigh not in component and board.is_dot(neigh, current)}
+    points = set()
+    for idx in walls:
+        count, dot = get_count(idx)
+        if count == 3:
+            if get_count(dot)[0] == 0:
+                points.add(idx)
+        elif count != 4:
+            points.add(idx)
+    return points
+
+
+def outside(board, component: set):
+    """
+    Клетки, достижимые от рамки в обход зоны.
+    """
+    cells = {idx for idx in range(len(board.cells))
+             if idx not in component and (
+                 board.pos(idx)[0] in (0, board.linesX - 1) or
+                 board.pos(idx)[1] in (0, board.linesY - 1))}
+    stack = list(cells)
+    while stack:
+        for neigh in board.neighbours(stack.pop()):
+            if neigh not in component and neigh not in cells:
+                cells.add(neigh)
+                stack.append(neigh)
+    return cells
+
+
+def has_pinch(component: set, linesY: int):
+    """
+    Касается ли зона сама себя по диагонали. Там прежний способ
+    и обход контура по-разному решают, куда идёт многоугольник.
+    """
+    for idx in component:
+        if (idx + linesY + 1 in component and
+                idx + linesY not in component and idx + 1 not in component):
+            return True
+        if (idx + linesY - 1 in component and
+                idx + linesY not in component and idx - 1 not in component):
+            return True
+    return False
+
+
+class Recorder(GameState):
+    """
+    Игра, которая запоминает точки прежнего многоугольника
+    рядом с каждым новым.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.checked = []
+
+    def build_cover(self, current: int, component: set):
+        expected = old_points(self.board, current, component)
+        super().build_cover(current, component)
+        self.checked.append((component, expected, self.polygons[-1]))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_traced_cover_matches_old_polygon(seed, random_game):
+    rnd = random.Random(seed)
+    size = rnd.choice([(9, 9), (20, 15), (39, 32)])
+    game = Recorder(*size)
+    for pos in random_game(game, rnd):
+        game.make_move(pos)
+
+    board = game.board
+    for component, expected, cover in game.checked:
+        points = cover.points()
+        #  Соседние вершины всегда соседние точки поля.
+        for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+            assert max(abs(x1 - x2), abs(y1 - y2)) == 1
+        if has_pinch(component, board.linesY):
+            continue
+        traced = {board.index(point) for point in points}
+        #  Точки игрока внутри зоны больше не попадают в контур,
+        #  а выступы стены внутрь зоны - попадают.
+        expected &= outside(board, component)
+        assert expected <= traced
+        for idx in traced - expected:
+            assert sum(neigh in component
+                       for neigh in board.neighbours(idx)) == 3
@@ -0,0 +1,54 @@
+import random
+import pytest
+from computer import Computer
+from engine import GameState, simulate
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_cached_evaluations_match_simulation(seed, next_move):
+    rnd = random.Random(seed)
+    size = rnd.choice([(8, 8), (12, 10), (15, 15)])
+    game = GameState(*size)
+    game.save_current()
+    computer = Computer(1, workers=0)
+    computer.load_game(game)
+    last = None
+    while not game.is_over():
+        roll = rnd.random()
+        if roll < 0.1 and game.can_undo():
+            game.undo()
+        elif roll < 0.15 and game.can_redo():
+            game.redo()
+        else:
+            last = next_move(game, rnd, last)
+            game.put_dot(last)
+        if not game.moves or game.is_over():
+            continue
+        last = game.moves[-1][1]
+
+        board = game.board
+        me = game.turn
+        enemy = (me + 1) % 2
+        near = board.candidates_near(enemy, board.index(last), 3)
+        #  Иногда и кандидаты подальше, чтобы проверить старые оценки.
+        possible_pos = [board.pos(idx) for idx in near +
+                        board.candidates(me)[:rnd.randrange(10)]]
+        possible_pos = list(dict.fromkeys(possible_pos))
+        expected = simulate(game.copy(), possible_pos, me, enemy)
+        assert computer.evaluate(possible_pos, me, enemy) == expected
+
+    assert computer.evaluations.stats()["hits"] > 0
+
+
+def test_stopped_evaluation_returns_nothing():
+    game = GameState(15, 15)
+    game.put_dot((7, 7))
+    computer = Computer(1, workers=0)
+    computer.load_game(game)
+    possible_pos = [game.board.pos(idx)
+                    for idx in game.board.free_neighbours8(
+                        game.board.index((7, 7)))]
+    computer.stop.set()
+    assert simulate(game, possible_pos, 1, 0, stop=computer.stop) == []
+    assert computer.smart_move((7, 7)) is None
+    assert computer.evaluations.stats()["size"] == 0
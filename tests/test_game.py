@@ -0,0 +1,77 @@
+import os
+import pytest
+import protocol
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pytest.importorskip("pygame")
+
+from computer import Computer  # noqa: E402
+from game import Game  # noqa: E402
+from sync import Sync  # noqa: E402
+
+
+class Connection:
+    """
+    Соединение, которое отдаёт заданные сообщения
+    и запоминает отправленные.
+    """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.sent = []
+        self.closed = False
+
+    def poll(self):
+        messages, self.messages = self.messages, []
+        return messages
+
+    def send(self, kind, payload=b""):
+        self.sent.append((kind, payload))
+
+
+def test_undo_while_thinking_takes_back_only_player_move():
+    computer = Computer(2, workers=0, think_time=30)
+    game = Game(10, 10, "PVC", computer)
+    computer.load_game(game)
+    game.save_current()
+    #  Ход игрока и ответ компьютера.
+    game.put_dot((2, 2), history_lock=True)
+    game.put_dot((3, 3))
+    position = (bytes(game.board.cells), list(game.score), game.turn,
+                list(game.moves))
+
+    game.put_dot((5, 5), history_lock=True)
+    computer.think((5, 5))
+    assert computer.is_thinking()
+    game.take_back()
+
+    assert not computer.is_thinking()
+    assert (bytes(game.board.cells), list(game.score), game.turn,
+            list(game.moves)) == position
+    computer.close()
+
+
+def test_undo_while_thinking_without_player_move_is_ignored():
+    computer = Computer(2, workers=0, think_time=30)
+    game = Game(10, 10, "PVC", computer)
+    computer.load_game(game)
+    game.put_dot((2, 2), history_lock=True)
+    game.save_current()
+    computer.think((2, 2))
+    game.take_back()
+
+    assert computer.is_thinking()
+    assert game.moves == [(0, (2, 2))]
+    computer.close()
+
+
+def test_resync_off_the_board_asks_for_moves_again():
+    game = Game(10, 10, "ONLINE")
+    sync = Sync(game, authority=False)
+    sync.play((5, 5))
+    payload = protocol.pack_resync(0, [(0, (5, 5)), (1, (200, 3))])
+    connection = Connection([(protocol.RESYNC, payload)])
+
+    assert game.receive(connection, sync, 0)
+    assert connection.sent == [(protocol.DESYNC, protocol.pack_index(0))]
+    assert sync.log == [(0, (5, 5))]
@@ -0,0 +1,92 @@
+import io
+import random
+import pytest
+import game_record
+from engine import GameState
+from game_record import Record, pack_moves, read_records
+
+
+def sandbox_moves(seed, linesX, linesY):
+    """
+    Ходы в песочнице: точки в случайном порядке,
+    иногда один игрок ходит несколько раз подряд.
+    """
+    rnd = random.Random(seed)
+    points = [(x, y) for x in range(linesX) for y in range(linesY)]
+    rnd.shuffle(points)
+    return [(rnd.randrange(2), pos) for pos in points[:60]]
+
+
+def make_record(moves, linesX, linesY, game_mode="SB", **kwargs):
+    return Record(linesX, linesY, game_mode, ("Синие", "Красные"),
+                  len(moves), pack_moves(moves, linesY), **kwargs)
+
+
+def test_two_records_round_trip_through_one_stream():
+    first_moves = sandbox_moves(1, 39, 32)
+    second_moves = [(0, (0, 0)), (1, (14, 9)), (0, (0, 1)), (1, (7, 7))]
+    settings = {"think_time": 1.5, "defence_priority": 1.25,
+                "attack_priority": 0.5, "depth": 4, "check_area": 3}
+    first = make_record(first_moves, 39, 32)
+    second = Record(15, 10, "PVC", ("Игрок", "Компьютер"),
+                    len(second_moves), pack_moves(second_moves, 10),
+                    is_computer_first=True, level=3, settings=settings)
+    #  Ходы не того игрока действительно есть в первой записи.
+    assert any(a == b for (a, _), (b, _) in zip(first_moves,
+                                                first_moves[1:]))
+
+    stream = io.BytesIO(first.to_bytes() + second.to_bytes())
+    one, two = read_records(stream)
+
+    assert list(one.moves()) == first_moves
+    assert (one.linesX, one.linesY, one.game_mode, one.names) == \
+        (39, 32, "SB", ("Синие", "Красные"))
+    assert one.settings is None and not one.is_computer_first
+    assert list(two.moves()) == second_moves
+    assert (two.linesX, two.linesY, two.game_mode, two.names) == \
+        (15, 10, "PVC", ("Игрок", "Компьютер"))
+    assert two.is_computer_first and two.level == 3
+    assert two.settings == settings
+
+
+def test_record_of_game_replays_to_same_state():
+    state = GameState(12, 12, "SB")
+    for player, pos in sandbox_moves(2, 12, 12):
+        state.make_move(pos, player)
+        state.moves.append((player, pos))
+    record = game_record.record_of(state)
+    replayed = game_record.replay(record)
+    assert bytes(replayed.board.cells) == bytes(state.board.cells)
+    assert replayed.score == state.score
+
+
+def test_version_1_record_without_settings_loads():
+    moves = [(0, (3, 4)), (1, (5, 5)), (0, (3, 5))]
+    data = make_record(moves, 10, 10, "PVP").to_bytes()
+    head = game_record.HEADER.unpack_from(data)
+    assert not head[5] & game_record.HAS_SETTINGS
+    old = game_record.HEADER.pack(head[0], 1, *head[2:]) + \
+        data[game_record.HEADER.size:]
+
+    [record] = read_records(io.BytesIO(old))
+    assert list(record.moves()) == moves
+    assert record.settings is None
+
+
+def test_truncated_record_raises():
+    settings = dict.fromkeys(game_record.SETTING_NAMES, 1)
+    data = make_record(sandbox_moves(3, 20, 20), 20, 20,
+                       settings=settings).to_bytes()
+    assert list(read_records(io.BytesIO(b""))) == []
+    for cut in range(1, len(data)):
+        with pytest.raises(ValueError):
+            list(read_records(io.BytesIO(data[:cut])))
+
+
+def test_unknown_header_raises():
+    data = bytearray(make_record([], 10, 10).to_bytes())
+    for offset, value in [(0, ord("X")), (2, 3), (2, 0), (5, 9)]:
+        broken = bytearray(data)
+        broken[offset] = value
+        with pytest.raises(ValueError):
+            list(read_records(io.BytesIO(bytes(broken))))
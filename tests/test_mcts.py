@@ -0,0 +1,55 @@
+import random
+import pytest
+from board import OWNER, CAPTURED
+from engine import GameState
+from mcts import MCTS, RolloutBoard
+
+
+def dots(cells):
+    return bytes(cell & (OWNER | CAPTURED) for cell in cells)
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_rollout_board_matches_game_state(seed, random_game):
+    rnd = random.Random(seed)
+    size = rnd.choice([(8, 8), (15, 15), (39, 32)])
+    game = GameState(*size)
+    for count, pos in enumerate(random_game(game, rnd)):
+        game.make_move(pos)
+        if count % 3:
+            continue
+        #  Случайная партия на лёгком поле и то же самое,
+        #  как раньше: точки на копии состояния и проверка в конце.
+        board = RolloutBoard(game)
+        state = game.copy()
+        turn = game.turn
+        free = [idx for idx, cell in enumerate(board.cells) if cell == 0]
+        for idx in rnd.sample(free, min(len(free), rnd.randrange(1, 15))):
+            board.put(idx, turn)
+            state.board.put(idx, turn)
+            state.pending[0].add(idx)
+            state.pending[1].add(idx)
+            turn = (turn + 1) % 2
+        for current in (turn, (turn + 1) % 2):
+            board.check(current)
+            state.check(current)
+        assert board.score == state.score
+        assert dots(board.cells) == dots(state.board.cells)
+
+
+def test_rollout_leaves_state_untouched():
+    game = GameState(15, 15)
+    rnd = random.Random(3)
+    last = None
+    for _ in range(60):
+        free = [idx for idx, cell in enumerate(game.board.cells)
+                if cell == 0]
+        last = rnd.choice(free)
+        game.make_move(game.board.pos(last))
+    before = (bytes(game.board.cells), game.board.hash, list(game.score),
+              [set(cells) for cells in game.pending])
+    search = MCTS()
+    for _ in range(50):
+        search.rollout(game, last)
+    assert (bytes(game.board.cells), game.board.hash, list(game.score),
+            [set(cells) for cells in game.pending]) == before
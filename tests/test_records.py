@@ -0,0 +1,72 @@
+from records import Records, rating
+
+
+def open_records(tmp_path, legacy=None):
+    return Records(str(tmp_path / "records.db"),
+                   str(legacy or tmp_path / "records.txt"))
+
+
+def test_top_orders_by_rating_and_keeps_ties_in_insert_order(tmp_path):
+    records = open_records(tmp_path)
+    records.add("a", 10, 10, 10)
+    records.add("b", 40, 10, 10)
+    #  Тот же результат, что у b, но на другом поле.
+    records.add("c", 10, 20, 20)
+    records.add("d", 5, 39, 32)
+    records.add("e", 20, 10, 10)
+
+    assert rating(40, 10, 10) == rating(10, 20, 20)
+    assert [row[0] for row in records.top(10)] == ["d", "b", "c", "e", "a"]
+    assert records.top(2) == [("d", 5, 39, 32), ("b", 40, 10, 10)]
+    assert records.top(0) == []
+    records.close()
+
+
+def test_top_filters_by_size_and_name(tmp_path):
+    records = open_records(tmp_path)
+    records.add("a", 10, 10, 10)
+    records.add("a", 30, 10, 10)
+    records.add("b", 50, 10, 10)
+    records.add("a", 50, 15, 10)
+    records.add("b", 1, 10, 15)
+
+    assert records.top(10, size=(10, 10)) == [
+        ("b", 50, 10, 10), ("a", 30, 10, 10), ("a", 10, 10, 10)]
+    assert records.top(10, size=(10, 15)) == [("b", 1, 10, 15)]
+    assert records.top(10, name="a") == [
+        ("a", 50, 15, 10), ("a", 30, 10, 10), ("a", 10, 10, 10)]
+    assert records.top(1, size=(10, 10), name="a") == [("a", 30, 10, 10)]
+    assert records.top(10, size=(20, 20)) == []
+    assert records.top(10, name="c") == []
+    records.close()
+
+
+def test_legacy_table_is_imported_once(tmp_path):
+    legacy = tmp_path / "records.txt"
+    legacy.write_text(
+        "Вася Пупкин 10 39 32\n"
+        "b 5 10 10\n"
+        "\n"
+        "broken line\n"
+        "c x 10 10\n"
+        "zero 0 10 10\n", encoding="utf-8")
+
+    records = open_records(tmp_path, legacy)
+    expected = [("b", 5, 10, 10), ("Вася Пупкин", 10, 39, 32)]
+    assert sorted(records.top(10)) == sorted(expected)
+    records.close()
+
+    #  Повторное открытие и повторный перенос ничего не добавляют.
+    records = open_records(tmp_path, legacy)
+    records.load_legacy(str(legacy))
+    assert sorted(records.top(10)) == sorted(expected)
+    records.close()
+
+
+def test_records_survive_reopening(tmp_path):
+    records = open_records(tmp_path)
+    records.add("a", 10, 10, 10)
+    records.close()
+    records = open_records(tmp_path)
+    assert records.top(5) == [("a", 10, 10, 10)]
+    records.close()
@@ -0,0 +1,84 @@
+import asyncio
+import protocol
+from server import Player, Server, WRITE_LIMIT
+
+
+async def join(port, name, room="", size=(10, 10)):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(protocol.encode(
+        protocol.JOIN, protocol.pack_join(size, name, room)))
+    await writer.drain()
+    return reader, writer
+
+
+def run(test):
+    async def main():
+        server = Server()
+        listener = await asyncio.start_server(
+            server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            await asyncio.wait_for(test(server, port), 10)
+        finally:
+            listener.close()
+    asyncio.run(main())
+
+
+def test_room_names_starting_with_hash_are_reserved():
+    async def test(server, port):
+        #  Автоматический подбор создаёт комнату #1.
+        waiting, first = await join(port, "a")
+        reader, writer = await join(port, "b", "#1")
+        kind, payload = await protocol.read_message(reader)
+        assert kind == protocol.REJECT
+        assert payload.decode().endswith("#")
+
+        #  Второй игрок подбора попадает к первому.
+        other, second = await join(port, "c")
+        for stream in (waiting, other):
+            kind, _ = await protocol.read_message(stream)
+            assert kind == protocol.START
+        for stream in (first, second, writer):
+            stream.close()
+    run(test)
+
+
+class Writer:
+    """
+    Соединение, которое ничего не отправляет: все байты копятся.
+    """
+
+    def __init__(self):
+        self.transport = self
+        self.buffer = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+
+    def get_write_buffer_size(self):
+        return len(self.buffer)
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+def test_player_who_does_not_read_is_disconnected():
+    server = Server()
+    player = Player(Writer())
+    payload = bytes(1000)
+    sent = 0
+    while not player.writer.closed:
+        server.send(player, protocol.STATS, payload)
+        sent += 1
+    assert player.writer.get_write_buffer_size() > WRITE_LIMIT
+    assert sent == WRITE_LIMIT // (
+        protocol.HEADER.size + len(payload)) + 1
+
+    #  В закрытое соединение больше ничего не пишется.
+    server.send(player, protocol.STATS, payload)
+    assert sent * (protocol.HEADER.size + len(payload)) == \
+        player.writer.get_write_buffer_size()
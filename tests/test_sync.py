@@ -0,0 +1,156 @@
+import struct
+import pytest
+import protocol
+from engine import GameState
+from sync import Sync
+
+
+@pytest.mark.parametrize("moves", [
+    [(0, (10, 0))],
+    [(0, (0, 10))],
+    [(0, (1, 1)), (1, (255, 255))],
+    [(2, (1, 1))],
+])
+def test_resync_rejects_moves_off_the_board(moves):
+    sync = Sync(GameState(10, 10), authority=False)
+    sync.play((5, 5))
+    cells = bytes(sync.state.board.cells)
+
+    with pytest.raises(ValueError):
+        sync.resync(0, moves)
+    assert bytes(sync.state.board.cells) == cells
+    assert sync.log == [(0, (5, 5))]
+
+
+def test_resync_rejects_start_past_the_log():
+    sync = Sync(GameState(10, 10), authority=False)
+    with pytest.raises(ValueError):
+        sync.resync(1, [(1, (2, 2))])
+    assert sync.log == []
+
+
+def exchange(sender, receiver, pos, damage=None):
+    """
+    Ход sender, отправленный receiver через кадры протокола.
+    damage - точка, которую receiver получит вместо pos.
+    Возвращает причину расхождения или None.
+    """
+    hash_value = sender.play(pos)
+    decoder = protocol.Decoder()
+    [(kind, payload)] = decoder.feed(protocol.encode(
+        protocol.MOVE, protocol.pack_move(damage or pos, hash_value)))
+    assert kind == protocol.MOVE
+    pos, hash_value = protocol.unpack_move(payload)
+    reason = receiver.validate(pos, sender.state.turn ^ 1)
+    if reason is None:
+        receiver.play(pos)
+        if not receiver.confirm(hash_value):
+            reason = "Состояния разошлись"
+    return reason
+
+
+def resync(client, host):
+    """
+    Клиент просит ходы с последнего совпавшего состояния.
+    """
+    start = protocol.unpack_index(protocol.pack_index(client.agreed))
+    client.resync(*protocol.unpack_resync(
+        protocol.pack_resync(start, host.moves_from(start))))
+
+
+def test_client_rolls_back_to_host_after_desync():
+    host = Sync(GameState(10, 10), authority=True)
+    client = Sync(GameState(10, 10), authority=False)
+    assert exchange(host, client, (2, 2)) is None
+    assert exchange(client, host, (3, 3)) is None
+    #  Свой ход клиент считает согласованным после ответа хоста.
+    assert (host.agreed, client.agreed) == (2, 1)
+
+    #  Ход хоста дошёл до клиента испорченным.
+    reason = exchange(host, client, (4, 4), damage=(4, 5))
+    assert reason == "Состояния разошлись"
+    assert client.hash() != host.hash()
+
+    resync(client, host)
+    assert client.log == host.log
+    assert client.hash() == host.hash()
+    assert bytes(client.state.board.cells) == bytes(host.state.board.cells)
+    assert client.agreed == len(host.log)
+    #  После восстановления партия идёт дальше.
+    assert exchange(client, host, (8, 8)) is None
+    assert exchange(host, client, (1, 8)) is None
+    assert client.agreed == len(host.log) == 5
+
+
+def test_resync_replays_from_empty_board_past_agreed_moves():
+    host = Sync(GameState(10, 10), authority=True)
+    client = Sync(GameState(10, 10), authority=False)
+    for pos in [(1, 1), (5, 5), (2, 1), (5, 6)]:
+        host.play(pos)
+    client.play((9, 9))
+    #  Ходы до совпавшего состояния клиент не хранит,
+    #  поэтому партия проигрывается заново.
+    client.resync(0, host.moves_from(0))
+    assert client.log == host.log
+    assert client.hash() == host.hash()
+
+
+def frames():
+    return [
+        (protocol.MOVE, protocol.pack_move((3, 4), 2 ** 63 + 5)),
+        (protocol.QUIT, b""),
+        (protocol.RESYNC, protocol.pack_resync(
+            7, [(0, (1, 2)), (1, (3, 4))])),
+        (protocol.REJECT, "Точка занята".encode()),
+    ]
+
+
+def test_decoder_reassembles_frames_split_at_any_offset():
+    data = b"".join(protocol.encode(*frame) for frame in frames())
+    for cut in range(len(data) + 1):
+        decoder = protocol.Decoder()
+        messages = decoder.feed(data[:cut]) + decoder.feed(data[cut:])
+        assert messages == frames()
+        assert not decoder.buffer
+
+
+def test_decoder_byte_by_byte():
+    data = b"".join(protocol.encode(*frame) for frame in frames())
+    decoder = protocol.Decoder()
+    messages = []
+    for i in range(len(data)):
+        messages += decoder.feed(data[i:i + 1])
+    assert messages == frames()
+
+
+def test_decoder_passes_unknown_types_through():
+    data = (protocol.encode(200, b"\x01\x02") +
+            protocol.encode(protocol.QUIT))
+    assert protocol.Decoder().feed(data) == [(200, b"\x01\x02"),
+                                             (protocol.QUIT, b"")]
+
+
+def test_decoder_waits_for_frame_longer_than_data():
+    decoder = protocol.Decoder()
+    data = protocol.HEADER.pack(100, protocol.MOVE) + b"\x01\x02"
+    assert decoder.feed(data) == []
+    assert decoder.feed(bytes(98)) == [(protocol.MOVE, b"\x01\x02" +
+                                        bytes(98))]
+
+
+@pytest.mark.parametrize("kind, payload", [
+    (protocol.MOVE, b"\x01"),
+    (protocol.DESYNC, b"\x01"),
+    (protocol.RESYNC, b"\x00"),
+    (protocol.RESYNC, b"\x00\x00\x01\x02"),
+])
+def test_payload_of_wrong_length_raises(kind, payload):
+    [(kind, payload)] = protocol.Decoder().feed(
+        protocol.encode(kind, payload))
+    unpack = {
+        protocol.MOVE: protocol.unpack_move,
+        protocol.DESYNC: protocol.unpack_index,
+        protocol.RESYNC: protocol.unpack_resync,
+    }[kind]
+    with pytest.raises((struct.error, ValueError)):
+        unpack(payload)